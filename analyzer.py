@@ -1,7 +1,14 @@
 import os
+import re
 import json
-from groq import Groq
+import threading
+import hashlib
+import concurrent.futures
+import asyncio
 from dotenv import load_dotenv
+from database import get_cached_analyses, save_cached_analyses
+from prompt_builder import pack_articles, estimate_messages_tokens, report_packing
+from llm_router import LLMRouter, GroqProvider, GeminiProvider
 
 try:
     import streamlit as st
@@ -17,25 +24,104 @@ def get_secret(key):
     value = os.getenv(key)
     if value:
         return value
-    if st and hasattr(st, 'secrets') and key in st.secrets:
-        return st.secrets[key]
+    try:
+        if st and hasattr(st, 'secrets') and key in st.secrets:
+            return st.secrets[key]
+    except Exception:
+        # secrets.toml 이 없으면 조회 자체가 예외 (GEMINI_API_KEY 같은 선택 키는 없어도 됨)
+        pass
     return None
 
-GROQ_API_KEY = get_secret('GROQ_API_KEY')
-client = Groq(api_key=GROQ_API_KEY) if GROQ_API_KEY else None
+LLM_HEDGE_REQUESTS = os.getenv('LLM_HEDGE_REQUESTS') == '1'  # 느린 응답에 2순위 제공자로 중복 요청
+
+_router = None
+_router_lock = threading.Lock()
+
+def get_router():
+    """
+    LLM 라우터 (첫 LLM 호출 때 생성).
+    키 조회(Streamlit Secrets 파싱)와 SDK 클라이언트 생성을 import 시점에서 빼서 앱 시작/rerun 을 가볍게 함.
+    키가 있는 제공자만 사용 (Groq 우선, 지연 시간 기록이 쌓이면 빠른 쪽으로)
+    """
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = LLMRouter(
+                    [GroqProvider(get_secret('GROQ_API_KEY')), GeminiProvider(get_secret('GEMINI_API_KEY'))],
+                    hedge=LLM_HEDGE_REQUESTS
+                )
+    return _router
+
+async def close_router_async():
+    """현재 이벤트 루프에서 만든 LLM 비동기 클라이언트를 닫음 (asyncio.run 끝나기 전에 호출)"""
+    if _router is not None:
+        await _router.aclose()
+
+# 청크 분석 설정: 기사를 여러 요청으로 나눠 병렬 처리 (전체 시간 = 가장 느린 청크)
+ANALYSIS_CHUNK_SIZE = 5  # 청크당 최대 기사 수 (None 이면 한 번에 요청)
+ANALYSIS_CHUNK_MAX_CHARS = 3000  # 청크당 제목+내용 최대 글자 수
+ANALYSIS_MAX_WORKERS = 4  # 동시에 보낼 최대 요청 수
+MAX_NEWS_ITEMS = 10  # 최종 선정 기사 수
+
+# 프롬프트 토큰 예산 (요청 1건 기준, 추정치)
+ANALYSIS_INPUT_TOKEN_BUDGET = 6000  # 분석 요청 입력 토큰 한도
+ANALYSIS_OUTPUT_TOKEN_BUDGET = 4000  # 분석 요청 출력 토큰 한도 (max_tokens)
+ANALYSIS_TOKENS_PER_ARTICLE = 250  # 기사 1건(제목+내용) 최대 토큰, 넘으면 내용을 자름
+ANALYSIS_OUTPUT_TOKENS_PER_ARTICLE = 200  # 기사 1건 분석 결과 예상 토큰
+BRIEFING_INPUT_TOKEN_BUDGET = 2000
+BRIEFING_OUTPUT_TOKEN_BUDGET = 800
+BRIEFING_TOKENS_PER_ARTICLE = 60  # 브리핑은 제목만 사용
 
 def generate_briefing(news_list):
     """
     10개 뉴스를 종합 분석하여 오늘의 시장 브리핑 생성
     Returns: dict with 'mood', 'summary', 'hot_keywords'
     """
-    if not news_list or not client:
+    if not news_list or not get_router().available:
         return None
-    
-    news_content = ""
-    for idx, item in enumerate(news_list):
-        news_content += f"[{idx+1}] 제목: {item.get('title', '')}\n"
 
+    try:
+        response_text = get_router().complete('briefing', _briefing_request(news_list))
+        return json.loads(response_text)
+    except Exception as e:
+        print(f"Briefing generation error: {e}")
+        return None
+
+
+async def generate_briefing_async(news_list):
+    """generate_briefing 의 asyncio 버전"""
+    if not news_list or not get_router().available:
+        return None
+
+    try:
+        response_text = await get_router().complete_async('briefing', _briefing_request(news_list))
+        return json.loads(response_text)
+    except Exception as e:
+        print(f"Briefing generation error: {e}")
+        return None
+
+
+def _briefing_request(news_list):
+    """브리핑 요청 (기사 제목을 토큰 예산 안에서 패킹)"""
+    fixed_tokens = estimate_messages_tokens(_briefing_messages(""))
+    packed = pack_articles(
+        news_list, [("제목", "title")],
+        fixed_tokens=fixed_tokens,
+        input_budget=BRIEFING_INPUT_TOKEN_BUDGET,
+        per_article_tokens=BRIEFING_TOKENS_PER_ARTICLE,
+        trim_field="title"
+    )
+    report_packing("Briefing", packed, len(news_list))
+    return dict(
+        messages=_briefing_messages(packed['content']),
+        temperature=0.2,
+        max_tokens=BRIEFING_OUTPUT_TOKEN_BUDGET,
+        json_mode=True
+    )
+
+
+def _briefing_messages(news_content):
     system_prompt = "You are a Korean financial news analyst. Summarize market trends. Respond in Korean. Output valid JSON only."
 
     user_prompt = f"""아래 10개 경제 뉴스의 공통된 흐름을 분석해서 JSON으로 응답해줘.
@@ -56,41 +142,89 @@ def generate_briefing(news_list):
 - 모든 텍스트는 한국어로
 - hot_keywords는 뉴스에서 자주 언급된 테마/종목/이슈 3-5개
 """
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
 
-    try:
-        completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.2,
-            response_format={"type": "json_object"}
-        )
-        
-        response_text = completion.choices[0].message.content
-        return json.loads(response_text)
-    except Exception as e:
-        print(f"Briefing generation error: {e}")
-        return None
+
+def get_article_cache_key(item):
+    """기사 캐시 키: URL + 제목 + 본문 요약의 해시 (내용이 바뀌면 다시 분석)"""
+    url = item.get('originallink') or item.get('url') or item.get('link') or ''
+    raw = "\x1f".join([url, item.get('title', ''), item.get('description', '')])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
 
 
-def analyze_news(news_list):
+class _StreamingNewsParser:
     """
-    news_list: list of dicts from fetcher.py
-    Returns list of dicts with added analysis fields
+    스트리밍 응답에서 "news" 배열 원소를 JSON 객체가 완성되는 즉시 꺼냄
     """
-    if not news_list:
-        return []
+    def __init__(self):
+        self._buffer = ""
+        self._pos = None  # "news" 배열 내부에서 다음에 파싱할 위치
+        self._decoder = json.JSONDecoder()
+        self.done = False
+
+    def feed(self, text):
+        self._buffer += text
+        items = []
+        if self._pos is None:
+            match = re.search(r'"news"\s*:\s*\[', self._buffer)
+            if not match:
+                return items
+            self._pos = match.end()
+
+        while not self.done:
+            # 원소 사이의 공백/쉼표 건너뛰기
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in ' \t\r\n,':
+                self._pos += 1
+            if self._pos >= len(self._buffer):
+                break
+            if self._buffer[self._pos] == ']':
+                self.done = True
+                break
+            try:
+                obj, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                break  # 아직 객체가 덜 들어옴
+            self._pos = end
+            if isinstance(obj, dict):
+                items.append(obj)
+        return items
+
+
+def _parse_analysis_item(item, count):
+    """
+    LLM 응답의 뉴스 1건을 (0-based 인덱스, 분석 결과) 로 변환. 인덱스가 범위 밖이면 None.
+    """
+    if not isinstance(item, dict):
+        return None
+    try:
+        idx = int(item.get('index', 0)) - 1
+    except (TypeError, ValueError):
+        return None
+    if not 0 <= idx < count:
+        return None
+    return idx, {
+        'summary': item.get('summary', '요약 없음'),
+        'sentiment': item.get('sentiment', '중립'),
+        'theme': item.get('theme', ''),
+        'stocks': item.get('stocks', ''),
+        'comment': item.get('comment', '')
+    }
+
+
+def _parse_analysis_response(response_text):
+    """완성된 응답 전체에서 뉴스 리스트 추출"""
+    data = json.loads(response_text)
+    analyzed_data = data.get('news', []) if isinstance(data, dict) else []
     
-    if not client:
-        raise ValueError("GROQ_API_KEY not found in .env")
+    if not analyzed_data and isinstance(data, list):
+        analyzed_data = data
+    return analyzed_data
 
-    # 프롬프트 구성
-    news_content = ""
-    for idx, item in enumerate(news_list):
-        news_content += f"[{idx+1}] 제목: {item['title']}\n내용: {item['description']}\n\n"
 
+def _analysis_messages(news_content):
     system_prompt = """You are a Korean stock market expert analyst. Analyze news and recommend SPECIFIC listed stocks. 
 Always respond in Korean. Output valid JSON only."""
 
@@ -123,67 +257,395 @@ Always respond in Korean. Output valid JSON only."""
 - 이모지 사용 금지
 - stocks에는 반드시 상장된 종목명만 넣어
 """
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
 
-    try:
-        completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.1,
-            response_format={"type": "json_object"}
-        )
-        
-        response_text = completion.choices[0].message.content
-        
-        # JSON 파싱
-        data = json.loads(response_text)
-        analyzed_data = data.get('news', [])
+
+def _analysis_request(news_list):
+    """
+    분석 요청 준비 (토큰 예산을 넘는 기사는 내용을 자르거나 이번 요청에서 제외)
+    Returns: (포함된 기사의 news_list 인덱스, 라우터 요청) — 포함된 기사가 없으면 요청은 None
+    expected_tokens(입력 + 기사 수만큼의 출력)는 TPM 한도 예약에 사용 (max_tokens 는 상한일 뿐이라 과대 예약됨)
+    json_mode 는 완성 응답에만 적용 (스트리밍은 JSON 모드를 지원하지 않으므로 프롬프트로만 JSON 강제)
+    """
+    fixed_tokens = estimate_messages_tokens(_analysis_messages(""))
+    packed = pack_articles(
+        news_list, [("제목", "title"), ("내용", "description")],
+        fixed_tokens=fixed_tokens,
+        input_budget=ANALYSIS_INPUT_TOKEN_BUDGET,
+        output_budget=ANALYSIS_OUTPUT_TOKEN_BUDGET,
+        per_article_tokens=ANALYSIS_TOKENS_PER_ARTICLE,
+        output_tokens_per_article=ANALYSIS_OUTPUT_TOKENS_PER_ARTICLE,
+        trim_field="description"
+    )
+    report_packing("Analysis", packed, len(news_list))
+    
+    if not packed['indices']:
+        return [], None
+    return packed['indices'], dict(
+        messages=_analysis_messages(packed['content']),
+        temperature=0.1,
+        max_tokens=ANALYSIS_OUTPUT_TOKEN_BUDGET,
+        json_mode=True,
+        expected_tokens=packed['input_tokens'] + packed['output_tokens']
+    )
+
+
+class _AnalysisCollector:
+    """
+    응답(전체 또는 스트리밍 조각)을 {news_list 인덱스: 분석 결과} 로 모음.
+    on_item: 지정하면 기사 1건의 분석이 완성될 때마다 on_item(idx, analysis) 호출
+    """
+    def __init__(self, indices, on_item=None):
+        self.indices = indices
+        self.on_item = on_item
+        self.results = {}
+        self._parser = _StreamingNewsParser()
+        self._parts = []
+
+    def _add(self, item):
+        # 프롬프트 번호 → news_list 인덱스
+        parsed = _parse_analysis_item(item, len(self.indices))
+        if not parsed:
+            return
+        idx = self.indices[parsed[0]]
+        if idx in self.results:
+            return
+        self.results[idx] = parsed[1]
+        if self.on_item:
+            self.on_item(idx, parsed[1])
+
+    def add_response(self, response_text):
+        for item in _parse_analysis_response(response_text):
+            self._add(item)
+
+    def feed(self, delta):
+        self._parts.append(delta)
+        for item in self._parser.feed(delta):
+            self._add(item)
+
+    def finish_stream(self):
+        # "news" 배열을 못 찾은 경우 (예: 배열만 응답) 전체 응답으로 재시도
+        if not self.results:
+            response_text = "".join(self._parts).strip().strip('`')
+            if response_text.startswith('json'):
+                response_text = response_text[4:]
+            self.add_response(response_text)
+        return self.results
+
+
+def _request_analysis(news_list, on_item=None):
+    """
+    LLM에 뉴스 분석 요청 (라우터가 고른 제공자)
+    on_item: 지정하면 스트리밍으로 요청하고, 기사 1건의 분석이 완성될 때마다 on_item(idx, analysis) 호출
+    Returns: {news_list 내 위치(0-based): 분석 결과 dict}
+    """
+    indices, request = _analysis_request(news_list)
+    if not request:
+        return {}
+    collector = _AnalysisCollector(indices, on_item)
+    
+    if on_item is None:
+        collector.add_response(get_router().complete('analysis', request))
+        return collector.results
+
+    for delta in get_router().stream('analysis', request):
+        collector.feed(delta)
+    return collector.finish_stream()
+
+
+async def _request_analysis_async(news_list, on_item=None):
+    """_request_analysis 의 asyncio 버전"""
+    indices, request = _analysis_request(news_list)
+    if not request:
+        return {}
+    collector = _AnalysisCollector(indices, on_item)
+    
+    if on_item is None:
+        collector.add_response(await get_router().complete_async('analysis', request))
+        return collector.results
+
+    async for delta in get_router().stream_async('analysis', request):
+        collector.feed(delta)
+    return collector.finish_stream()
+
+
+def _split_chunks(news_list, chunk_size, max_chars):
+    """
+    기사 수(chunk_size)와 글자 수(max_chars) 한도 안에서 청크 분할
+    Returns: 청크별 news_list 인덱스 리스트
+    """
+    chunks = []
+    current = []
+    current_chars = 0
+    for idx, item in enumerate(news_list):
+        item_chars = len(item.get('title', '')) + len(item.get('description', ''))
+        if current and (len(current) >= chunk_size or current_chars + item_chars > max_chars):
+            chunks.append(current)
+            current = []
+            current_chars = 0
+        current.append(idx)
+        current_chars += item_chars
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _request_analysis_chunked(news_list, chunk_size, max_workers=ANALYSIS_MAX_WORKERS, on_item=None):
+    """
+    청크별로 _request_analysis 를 병렬 호출하고 원래 인덱스로 합침.
+    일부 청크가 실패해도 나머지 결과는 살림 (전부 실패하면 예외).
+    Returns: {news_list 내 위치(0-based): 분석 결과 dict}
+    """
+    chunks = _split_chunks(news_list, chunk_size, ANALYSIS_CHUNK_MAX_CHARS)
+    if len(chunks) == 1:
+        return _request_analysis(news_list, on_item=on_item)
+
+    results = {}
+    errors = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+        def submit(chunk):
+            # 스트리밍 콜백도 원래 인덱스로 변환해서 전달
+            chunk_on_item = None
+            if on_item:
+                chunk_on_item = lambda pos, analysis: on_item(chunk[pos], analysis)
+            return executor.submit(_request_analysis, [news_list[idx] for idx in chunk], chunk_on_item)
+
+        futures = {submit(chunk): chunk for chunk in chunks}
+        for future in concurrent.futures.as_completed(futures):
+            chunk = futures[future]
+            try:
+                chunk_result = future.result()
+            except Exception as e:
+                print(f"LLM API Error (chunk {chunk[0]+1}-{chunk[-1]+1}): {e}")
+                errors.append(e)
+                continue
+            _merge_chunk_result(results, chunk, chunk_result)
+
+    if errors and len(errors) == len(chunks):
+        raise errors[0]
+    return results
+
+
+async def _request_analysis_chunked_async(news_list, chunk_size,
+                                          max_workers=ANALYSIS_MAX_WORKERS, on_item=None):
+    """_request_analysis_chunked 의 asyncio 버전 (청크 요청을 동시에 max_workers 개까지)"""
+    chunks = _split_chunks(news_list, chunk_size, ANALYSIS_CHUNK_MAX_CHARS)
+    semaphore = asyncio.Semaphore(max_workers)
+
+    async def request(chunk):
+        chunk_on_item = None
+        if on_item:
+            chunk_on_item = lambda pos, analysis: on_item(chunk[pos], analysis)
+        async with semaphore:
+            return await _request_analysis_async([news_list[idx] for idx in chunk], chunk_on_item)
+
+    chunk_results = await asyncio.gather(*(request(chunk) for chunk in chunks), return_exceptions=True)
+
+    results = {}
+    errors = []
+    for chunk, chunk_result in zip(chunks, chunk_results):
+        if isinstance(chunk_result, Exception):
+            print(f"LLM API Error (chunk {chunk[0]+1}-{chunk[-1]+1}): {chunk_result}")
+            errors.append(chunk_result)
+            continue
+        _merge_chunk_result(results, chunk, chunk_result)
+
+    if errors and len(errors) == len(chunks):
+        raise errors[0]
+    return results
+
+
+def _merge_chunk_result(results, chunk, chunk_result):
+    # 청크 내 위치 → 원래 인덱스
+    for pos, analysis in chunk_result.items():
+        results[chunk[pos]] = analysis
+
+
+def _apply_analysis(original, analysis):
+    """
+    분석 결과를 원본 기사에 합침. 정보가치가 낮은 기사는 None 반환.
+    """
+    summary = analysis.get('summary', '요약 없음')
+    sentiment = analysis.get('sentiment', '중립')
+    theme = analysis.get('theme', '')
+    stocks = analysis.get('stocks', '')
+    comment = analysis.get('comment', '')
+    if isinstance(stocks, list):
+        # 모델이 종목을 배열로 주는 경우도 "A, B" 문자열로 통일 (DB stocks 컬럼 형식)
+        stocks = ', '.join(str(s) for s in stocks)
+
+    # --- 필터링 로직 (New) ---
+    # 1. 감성이 '중립'이면서
+    # 2. 구체적인 종목(stocks)이 없거나 '없음', '해당 없음' 등으로 표기된 경우
+    # => 과감히 제외 (정보가치 낮음)
+    is_neutral = (sentiment == '중립')
+    has_no_stock = (not stocks) or (stocks in ['없음', '해당 없음', '-', 'None'])
+    
+    if is_neutral and has_no_stock:
+        return None
+    
+    # 유효한 뉴스만 리스트에 추가
+    original['summary'] = summary
+    original['sentiment'] = sentiment
+    original['theme'] = theme
+    original['stocks'] = stocks
+    original['comment'] = comment
+    
+    # 예전 스키마/버전 호환용으로 keywords 필드에도 같은 정보를 JSON 으로 유지
+    original['keywords'] = json.dumps({
+        'theme': theme,
+        'stocks': stocks,
+        'comment': comment
+    }, ensure_ascii=False)
+    
+    return original
+
+
+class _AnalysisRun:
+    """
+    analyze_news 1회 실행 상태: 캐시 조회 → (LLM 요청은 호출하는 쪽에서) → 캐시 저장/상위 기사 선정
+    동기/asyncio 버전이 같은 선정 로직을 쓰도록 분리.
+    캐시 조회/저장(SQLite)은 호출하는 쪽에서 하고 결과만 넘김 (asyncio 버전은 이벤트 루프 밖 스레드에서 실행)
+    """
+    def __init__(self, news_list, on_result=None, on_missing=None):
+        self.news_list = news_list
+        self.on_result = on_result
+        self.on_missing = on_missing
+        self.cache_keys = [get_article_cache_key(item) for item in news_list]
+        self.analyses = {}
+        self.misses = []
+        # 스트리밍 모드: 미리보기로 이미 전달한 기사 (청크 스레드에서 동시에 호출되므로 lock)
+        self.previewed = set()
+        self._lock = threading.Lock()
+
+    def start(self, cached):
+        """cached: get_cached_analyses(self.cache_keys) 결과"""
+        self.analyses = cached
+        self.misses = [idx for idx, key in enumerate(self.cache_keys) if key not in self.analyses]
+        print(f"Analysis cache: {len(self.news_list) - len(self.misses)} hit, {len(self.misses)} miss")
         
-        if not analyzed_data and isinstance(data, list):
-            analyzed_data = data
+        if self.on_result:
+            for idx, key in enumerate(self.cache_keys):
+                if key in self.analyses:
+                    self._accept(idx, self.analyses[key])
+
+    def _accept(self, idx, analysis):
+        """미리보기 전용: 도착한 순서대로 on_result 호출 (최종 선정은 finish 에서 수집 순위대로)"""
+        with self._lock:
+            if idx in self.previewed:
+                return
+            merged = _apply_analysis(self.news_list[idx], analysis)
+            if merged is None:
+                return
+            self.previewed.add(idx)
+            self.on_result(merged)
+
+    @property
+    def pending(self):
+        """LLM에 보낼 캐시 미스 기사"""
+        return [self.news_list[idx] for idx in self.misses]
 
+    @property
+    def on_item(self):
+        if not self.on_result:
+            return None
+        # 캐시 미스 위치 → 원래 인덱스로 복원
+        return lambda pos, analysis: self._accept(self.misses[pos], analysis)
+
+    def new_entries(self, fresh):
+        """fresh: {캐시 미스 위치: 분석 결과} → 저장할 캐시 항목 {cache_key: 분석 결과}"""
+        # 캐시 미스 위치 → 원래 인덱스로 복원
+        return {self.cache_keys[self.misses[pos]]: analysis for pos, analysis in fresh.items()}
+
+    def finish(self, new_entries):
+        """new_entries: new_entries() 결과 (캐시 저장 후). Returns 선정된 기사 리스트"""
+        self.analyses.update(new_entries)
+
+        # 일부 청크 실패/토큰 예산 초과로 분석 결과가 없는 기사 (다음 실행에서 다시 분석하도록 알림)
+        if self.on_missing:
+            missing = [item for idx, item in enumerate(self.news_list) if self.cache_keys[idx] not in self.analyses]
+            if missing:
+                self.on_missing(missing)
+
+        # 스트리밍 여부와 관계없이 수집 순위(타겟 키워드 우선, 최신순)대로 선정
+        # (도착 순으로 고르면 먼저 응답한 청크의 기사가 상위 기사를 밀어냄)
         filtered_result = []
-        for item in analyzed_data:
-            idx = item.get('index', 0) - 1
-            if 0 <= idx < len(news_list):
-                original = news_list[idx]
-                
-                # AI 분석 결과 가져오기
-                summary = item.get('summary', '요약 없음')
-                sentiment = item.get('sentiment', '중립')
-                theme = item.get('theme', '')
-                stocks = item.get('stocks', '')
-                comment = item.get('comment', '')
-
-                # --- 필터링 로직 (New) ---
-                # 1. 감성이 '중립'이면서
-                # 2. 구체적인 종목(stocks)이 없거나 '없음', '해당 없음' 등으로 표기된 경우
-                # => 과감히 제외 (정보가치 낮음)
-                is_neutral = (sentiment == '중립')
-                has_no_stock = (not stocks) or (stocks in ['없음', '해당 없음', '-', 'None'])
-                
-                if is_neutral and has_no_stock:
-                    continue  # Skip this item
-                
-                # 유효한 뉴스만 리스트에 추가
-                original['summary'] = summary
-                original['sentiment'] = sentiment
-                
-                # keywords 필드에 구조화된 정보 저장 (JSON 형태)
-                original['keywords'] = json.dumps({
-                    'theme': theme,
-                    'stocks': stocks,
-                    'comment': comment
-                }, ensure_ascii=False)
-                
-                filtered_result.append(original)
+        for idx, item in enumerate(self.news_list):
+            analysis = self.analyses.get(self.cache_keys[idx])
+            if analysis is None:
+                continue
+            merged = _apply_analysis(item, analysis)
+            if merged is not None:
+                filtered_result.append(merged)
         
         # 상위 10개만 선정 (이미 중요도 순으로 정렬되어 있다고 가정하거나, 필요한 경우 추가 정렬)
         # 네이버 뉴스는 기본적으로 '관련도순'이므로, 필터링 후 상위 10개를 자르면 됨.
-        return filtered_result[:10]
+        return filtered_result[:MAX_NEWS_ITEMS]
 
-    except Exception as e:
-        print(f"Groq API Error: {e}")
-        raise e
+
+def analyze_news(news_list, chunk_size=ANALYSIS_CHUNK_SIZE, on_result=None, on_missing=None):
+    """
+    news_list: list of dicts from fetcher.py
+    chunk_size: 청크당 기사 수. None 이면 전체를 한 번의 요청으로 분석
+    on_result: 지정하면 응답을 스트리밍으로 받고, 선정된 기사가 확정될 때마다 on_result(item) 호출
+               (캐시 적중 기사 → 스트리밍 도착 순, 미리보기용. 반환하는 상위 10개는 항상 수집 순위대로)
+    on_missing: 분석 결과를 받지 못한 기사가 있으면 on_missing(items) 호출
+                (일부 청크만 실패하면 예외 없이 나머지 결과를 반환하므로, 재시도가 필요한 쪽에서 사용)
+    Returns list of dicts with added analysis fields
+
+    이전에 분석한 기사(analysis_cache)는 재사용하고, 캐시에 없는 기사만 LLM에 보냄.
+    """
+    if not news_list:
+        return []
+    
+    run = _AnalysisRun(news_list, on_result, on_missing)
+    run.start(get_cached_analyses(run.cache_keys))
+    fresh = {}
+    if run.misses:
+        if not get_router().available:
+            raise ValueError("GROQ_API_KEY / GEMINI_API_KEY not found in .env")
+        
+        try:
+            if chunk_size:
+                fresh = _request_analysis_chunked(run.pending, chunk_size, on_item=run.on_item)
+            else:
+                fresh = _request_analysis(run.pending, on_item=run.on_item)
+        except Exception as e:
+            print(f"LLM API Error: {e}")
+            raise e
+    
+    new_entries = run.new_entries(fresh)
+    save_cached_analyses(new_entries)
+    return run.finish(new_entries)
+
+
+async def analyze_news_async(news_list, chunk_size=ANALYSIS_CHUNK_SIZE, on_result=None, on_missing=None):
+    """
+    analyze_news 의 asyncio 버전 (청크 요청을 이벤트 루프에서 동시에).
+    캐시 조회/저장은 쓰기 트랜잭션이라 잠금 대기가 길어질 수 있으므로 스레드에서 실행 (동시에 도는 브리핑/청크 요청을 막지 않도록)
+    """
+    if not news_list:
+        return []
+    
+    run = _AnalysisRun(news_list, on_result, on_missing)
+    run.start(await asyncio.to_thread(get_cached_analyses, run.cache_keys))
+    fresh = {}
+    if run.misses:
+        if not get_router().available:
+            raise ValueError("GROQ_API_KEY / GEMINI_API_KEY not found in .env")
+        
+        try:
+            if chunk_size:
+                fresh = await _request_analysis_chunked_async(run.pending, chunk_size, on_item=run.on_item)
+            else:
+                fresh = await _request_analysis_async(run.pending, on_item=run.on_item)
+        except Exception as e:
+            print(f"LLM API Error: {e}")
+            raise e
+    
+    new_entries = run.new_entries(fresh)
+    await asyncio.to_thread(save_cached_analyses, new_entries)
+    return run.finish(new_entries)
@@ -0,0 +1,82 @@
+"""
+batch_date 인덱스 효과 측정용 벤치마크
+
+행 수를 늘려가며 인덱스 없는 스키마(v1)와 최신 스키마의 조회 지연을 비교합니다.
+임시 DB 파일을 사용하므로 daily_news.db 에는 영향이 없습니다.
+
+사용법: python bench_db.py [행수 ...]
+"""
+import os
+import sys
+import time
+import tempfile
+from datetime import datetime, timedelta
+
+import database
+from database import (
+    migrate, transaction, close_connection, SCHEMA_VERSION,
+    get_news_by_date, get_last_update_time
+)
+
+ROWS_PER_DAY = 20  # 하루 배치 크기 (실제 서비스는 10개 내외)
+REPEAT = 200  # 조회당 반복 횟수
+
+def populate(row_count):
+    """row_count 개의 뉴스를 하루 ROWS_PER_DAY 개씩 과거 날짜로 채움"""
+    base = datetime(2026, 1, 1)
+    rows = []
+    for i in range(row_count):
+        batch_date = (base - timedelta(days=i // ROWS_PER_DAY)).strftime("%Y-%m-%d")
+        rows.append((batch_date, f"제목 {i}", f"https://example.com/{i}", "", "요약", "호재", "{}"))
+    with transaction() as conn:
+        conn.executemany('''
+            INSERT INTO daily_news (batch_date, title, url, pub_date, summary, sentiment, keywords)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+    # 가장 오래된 날짜 (테이블 끝쪽 → 풀스캔 최악 조건)
+    return rows[-1][0]
+
+def time_ms(fn, *args):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        fn(*args)
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+def run(row_count, schema_version):
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    database.DB_PATH = path
+    try:
+        migrate(target_version=schema_version)
+        batch_date = populate(row_count)
+        result = {
+            'get_news_by_date': time_ms(get_news_by_date, batch_date),
+            'get_last_update_time': time_ms(get_last_update_time, batch_date),
+        }
+        # 삭제는 1회만 측정 (delete_news_by_date 는 v5 의 cache_meta 가 필요하므로 같은 DELETE 를 직접 실행)
+        start = time.perf_counter()
+        with transaction() as conn:
+            conn.execute("DELETE FROM daily_news WHERE batch_date = ?", (batch_date,))
+            conn.execute("DELETE FROM daily_briefing WHERE batch_date = ?", (batch_date,))
+        result['delete_news_by_date'] = (time.perf_counter() - start) * 1000
+        return result
+    finally:
+        close_connection()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+def main():
+    row_counts = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 100_000]
+
+    print(f"{'rows':>8} | {'query':<22} | {'v1 (ms)':>9} | {f'v{SCHEMA_VERSION} (ms)':>9} | speedup")
+    print("-" * 68)
+    for row_count in row_counts:
+        before = run(row_count, 1)
+        after = run(row_count, SCHEMA_VERSION)
+        for query in before:
+            speedup = before[query] / after[query] if after[query] else float('inf')
+            print(f"{row_count:>8} | {query:<22} | {before[query]:>9.3f} | {after[query]:>9.3f} | {speedup:>6.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+뉴스 필터링(키워드 매칭 + HTML 정리) 마이크로 벤치마크
+
+기존 방식(키워드마다 부분 문자열 검색, 매번 정규식 컴파일)과
+컴파일된 단일 패스 매처(KeywordMatcher)를 합성 기사 10만 건으로 비교합니다.
+네트워크 요청은 하지 않습니다.
+
+사용법: python bench_fetcher.py [기사수]
+"""
+import re
+import sys
+import time
+import random
+
+from fetcher import TARGET_KEYWORDS, EXCLUDE_KEYWORDS, clean_html, get_keyword_matcher
+
+WORDS = [
+    "삼성전자", "반도체", "수출", "정부", "금리", "투자", "실적", "발표", "기업", "시장",
+    "<b>경제</b>", "&quot;전망&quot;", "&amp;", "증가", "감소", "신규", "계약", "글로벌", "AI", "배터리"
+]
+
+def make_articles(count, seed=42):
+    rng = random.Random(seed)
+    keywords = TARGET_KEYWORDS + EXCLUDE_KEYWORDS
+    articles = []
+    for _ in range(count):
+        title_words = rng.choices(WORDS, k=8)
+        desc_words = rng.choices(WORDS, k=30)
+        # 약 30% 기사에 키워드 1개 삽입
+        if rng.random() < 0.3:
+            desc_words.insert(rng.randrange(len(desc_words)), rng.choice(keywords))
+        articles.append((" ".join(title_words), " ".join(desc_words)))
+    return articles
+
+# --- 기존 구현 (비교용) ---
+def legacy_clean_html(raw_html):
+    cleanr = re.compile('<.*?>')
+    cleantext = re.sub(cleanr, '', raw_html)
+    return cleantext.replace('&quot;', '"').replace('&lt;', '<').replace('&gt;', '>').replace('&amp;', '&')
+
+def legacy_should_exclude(title, description):
+    text = (title + " " + description).lower()
+    for keyword in EXCLUDE_KEYWORDS:
+        if keyword.lower() in text:
+            return True
+    return False
+
+def legacy_has_target_keyword(title, description):
+    text = (title + " " + description).lower()
+    for keyword in TARGET_KEYWORDS:
+        if keyword.lower() in text:
+            return True
+    return False
+
+def run_legacy(articles):
+    kept = 0
+    for raw_title, raw_desc in articles:
+        title = legacy_clean_html(raw_title)
+        description = legacy_clean_html(raw_desc)
+        if legacy_should_exclude(title, description):
+            continue
+        legacy_has_target_keyword(title, description)
+        kept += 1
+    return kept
+
+def run_matcher(articles):
+    matcher = get_keyword_matcher()
+    kept = 0
+    for raw_title, raw_desc in articles:
+        title = clean_html(raw_title)
+        description = clean_html(raw_desc)
+        targets, excludes = matcher.match_article(title, description)
+        if excludes:
+            continue
+        kept += 1
+    return kept
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    articles = make_articles(count)
+
+    results = {}
+    for name, fn in (("legacy", run_legacy), ("matcher", run_matcher)):
+        start = time.perf_counter()
+        kept = fn(articles)
+        elapsed = time.perf_counter() - start
+        results[name] = (elapsed, kept)
+        print(f"{name:<8} {elapsed:7.3f}s  {count / elapsed:>10,.0f} articles/s  kept={kept}")
+
+    if results["legacy"][1] != results["matcher"][1]:
+        print("WARNING: 두 구현의 필터 결과가 다릅니다")
+    print(f"speedup  {results['legacy'][0] / results['matcher'][0]:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,392 @@
+"""
+파이프라인 오프라인 벤치마크 (실제 API 할당량을 쓰지 않음)
+
+로컬에 가짜 네이버 검색 서버와 가짜 Groq(OpenAI 호환) chat completion 서버를 띄우고
+fetch_naver_news_multi_async / analyze_news / generate_briefing / process_news_data(전체, 증분) 를 반복 실행해
+단계별 p50/p95/p99 지연, 처리량, 토큰 수를 측정합니다.
+결과는 커밋 해시와 함께 bench_results.jsonl 에 누적되고, 같은 설정의 직전 결과와 비교해 출력합니다.
+
+임시 DB 파일을 사용하므로 daily_news.db 에는 영향이 없습니다.
+반복마다 분석 캐시를 비우므로 (--warm-cache 제외) 매번 LLM 호출까지 측정됩니다.
+
+사용법:
+    python bench_pipeline.py
+    python bench_pipeline.py --iterations 50 --llm-latency 0.8 --llm-error-rate 0.05
+    python bench_pipeline.py --naver-latency 0.2 --description-chars 400 --stages analyze briefing
+"""
+import os
+import re
+import asyncio
+import sys
+import json
+import zlib
+import time
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from prompt_builder import estimate_tokens
+from pipeline_metrics import percentile
+
+RESULTS_PATH = 'bench_results.jsonl'
+STAGES = ['fetch', 'analyze', 'briefing', 'process', 'refresh']
+CANDIDATES = 20  # analyze/briefing 단계 입력 기사 수 (pipeline.CANDIDATE_COUNT 와 같음)
+
+WORDS = [
+    "삼성전자", "반도체", "수출", "정부", "금리", "투자", "실적", "발표", "기업", "시장",
+    "수주", "체결", "공시", "급등", "배터리", "AI", "글로벌", "증가", "감소", "신규"
+]
+
+# --- 가짜 서버 ---
+
+class FakeServerConfig:
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, seed=42):
+        self.latency = latency  # 응답 지연(초)
+        self.jitter = jitter  # 지연에 더할 무작위 범위(초)
+        self.error_rate = error_rate  # 오류 응답 비율 (0~1)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def before_response(self):
+        """지연을 적용하고 이번 요청을 실패시킬지 결정"""
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+            fail = self._rng.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        if delay:
+            time.sleep(delay)
+        return fail
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive (실제 API 와 같은 커넥션 재사용)
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+def make_naver_handler(config, description_chars):
+    """네이버 뉴스 검색 API 흉내: query/start/display 에 따라 결정적인 기사 생성"""
+    now = datetime(2026, 1, 1, 9, tzinfo=timezone.utc)
+
+    class NaverHandler(_QuietHandler):
+        def do_GET(self):
+            if config.before_response():
+                self._send_json(500, {'errorMessage': 'fake server error'})
+                return
+            query = parse_qs(urlparse(self.path).query)
+            text = query.get('query', [''])[0]
+            start = int(query.get('start', ['1'])[0])
+            display = int(query.get('display', ['10'])[0])
+            items = []
+            for i in range(start, start + display):
+                rng = random.Random(f"{text}:{i}")
+                title = " ".join(rng.choices(WORDS, k=6))
+                description = " ".join(rng.choices(WORDS, k=max(1, description_chars // 4)))[:description_chars]
+                items.append({
+                    'title': f"<b>{text}</b> {title}",
+                    'originallink': f"https://news.example.com/{zlib.crc32(text.encode()) % 1000}/{i}",
+                    'link': f"https://n.news.naver.com/{zlib.crc32(text.encode()) % 1000}/{i}",
+                    'description': description.replace("AI", "&quot;AI&quot;"),
+                    'pubDate': format_datetime(now - timedelta(minutes=i)),
+                })
+            self._send_json(200, {'items': items})
+
+    return NaverHandler
+
+class LLMTokenCounter:
+    """가짜 LLM 서버가 처리한 토큰 수 (단계별 토큰 집계용)"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def add(self, prompt, completion):
+        with self._lock:
+            self.prompt_tokens += prompt
+            self.completion_tokens += completion
+
+    def snapshot(self):
+        with self._lock:
+            return self.prompt_tokens, self.completion_tokens
+
+def _fake_llm_content(messages, summary_chars):
+    """분석 요청이면 기사 번호별 분석, 아니면 브리핑 JSON"""
+    prompt = messages[-1]['content'] if messages else ''
+    if '"news"' not in prompt:
+        return json.dumps({
+            'mood': '맑음', 'mood_label': '호재 우세',
+            'summary': '시장 요약 ' * max(1, summary_chars // 6),
+            'hot_keywords': ['반도체', '금리', '수출'],
+        }, ensure_ascii=False)
+
+    count = len(re.findall(r'^\[(\d+)\] 제목', prompt, re.M))
+    news = []
+    for i in range(count):
+        # 1/4 은 '중립 + 종목 없음' → analyze_news 필터 경로도 측정
+        neutral = i % 4 == 3
+        news.append({
+            'index': i + 1,
+            'summary': ('요약 ' * max(1, summary_chars // 3))[:summary_chars],
+            'sentiment': '중립' if neutral else ('호재' if i % 2 else '악재'),
+            'theme': '반도체',
+            'stocks': '' if neutral else '삼성전자, SK하이닉스',
+            'comment': '관련 설명',
+        })
+    return json.dumps({'news': news}, ensure_ascii=False, indent=2)
+
+def make_llm_handler(config, counter, summary_chars, stream_chunk_chars=16):
+    """Groq(OpenAI 호환) /openai/v1/chat/completions 흉내 (stream=True 는 SSE 로 응답)"""
+
+    class LLMHandler(_QuietHandler):
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            if config.before_response():
+                # 429 + retry-after 로 재시도 경로까지 측정
+                self._send_json(429, {'error': {'message': 'rate limited', 'type': 'tokens'}},
+                                headers={'retry-after': '0'})
+                return
+
+            messages = request.get('messages', [])
+            content = _fake_llm_content(messages, summary_chars)
+            prompt_tokens = sum(estimate_tokens(m.get('content', '')) for m in messages)
+            completion_tokens = estimate_tokens(content)
+            counter.add(prompt_tokens, completion_tokens)
+            base = {'id': 'bench', 'created': int(time.time()), 'model': request.get('model', 'bench')}
+            usage = {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens,
+            }
+
+            if not request.get('stream'):
+                self._send_json(200, dict(base, object='chat.completion', choices=[{
+                    'index': 0, 'finish_reason': 'stop',
+                    'message': {'role': 'assistant', 'content': content},
+                }], usage=usage))
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            for pos in range(0, len(content), stream_chunk_chars):
+                chunk = dict(base, object='chat.completion.chunk', choices=[{
+                    'index': 0, 'finish_reason': None,
+                    'delta': {'content': content[pos:pos + stream_chunk_chars]},
+                }])
+                self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+            # 실제 API 처럼 마지막 조각의 x_groq.usage 로 전체 사용량 전달
+            final = dict(base, object='chat.completion.chunk', choices=[{
+                'index': 0, 'finish_reason': 'stop', 'delta': {},
+            }], x_groq={'id': 'bench', 'usage': usage})
+            self.wfile.write(f"data: {json.dumps(final)}\n\n".encode('utf-8'))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.close_connection = True
+
+    return LLMHandler
+
+def start_server(handler):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# --- 측정 ---
+
+def summarize(durations, items, tokens, errors):
+    ordered = sorted(durations)
+    total = sum(durations)
+    return {
+        'runs': len(durations),
+        'errors': errors,
+        'p50_ms': round(percentile(ordered, 50) * 1000, 2) if ordered else None,
+        'p95_ms': round(percentile(ordered, 95) * 1000, 2) if ordered else None,
+        'p99_ms': round(percentile(ordered, 99) * 1000, 2) if ordered else None,
+        'items_per_sec': round(items / total, 2) if total else None,
+        'prompt_tokens_per_run': round(tokens[0] / len(durations)) if durations else 0,
+        'completion_tokens_per_run': round(tokens[1] / len(durations)) if durations else 0,
+    }
+
+def run_stage(name, fn, iterations, counter, before_each=None):
+    """fn() 은 처리한 항목 수를 반환. 예외는 오류로 세고 계속 진행"""
+    durations = []
+    items = 0
+    errors = 0
+    tokens_before = counter.snapshot()
+    for _ in range(iterations):
+        if before_each:
+            before_each()
+        start = time.perf_counter()
+        try:
+            items += fn() or 0
+        except Exception as e:
+            errors += 1
+            print(f"[Bench] {name} error: {e}")
+            continue
+        durations.append(time.perf_counter() - start)
+    tokens_after = counter.snapshot()
+    tokens = (tokens_after[0] - tokens_before[0], tokens_after[1] - tokens_before[1])
+    return summarize(durations, items, tokens, errors)
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+def load_previous(config):
+    """같은 설정으로 저장된 가장 최근 결과"""
+    if not os.path.exists(RESULTS_PATH):
+        return None
+    previous = None
+    with open(RESULTS_PATH, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get('config') == config:
+                previous = record
+    return previous
+
+def print_report(results, previous):
+    print(f"\n{'stage':<10} | {'p50 ms':>9} | {'p95 ms':>9} | {'p99 ms':>9} | {'items/s':>8} | "
+          f"{'tok in/run':>10} | {'tok out/run':>11} | {'err':>3} | vs prev p50")
+    print("-" * 104)
+    for stage, metrics in results.items():
+        change = ""
+        before = (previous or {}).get('results', {}).get(stage, {}).get('p50_ms')
+        if before and metrics['p50_ms']:
+            change = f"{(metrics['p50_ms'] - before) / before * 100:+.1f}%"
+
+        def fmt(value, spec):
+            return format(value, spec) if value is not None else '-'
+
+        print(f"{stage:<10} | {fmt(metrics['p50_ms'], '>9.2f')} | {fmt(metrics['p95_ms'], '>9.2f')} | "
+              f"{fmt(metrics['p99_ms'], '>9.2f')} | {fmt(metrics['items_per_sec'], '>8.2f')} | "
+              f"{metrics['prompt_tokens_per_run']:>10} | {metrics['completion_tokens_per_run']:>11} | "
+              f"{metrics['errors']:>3} | {change}")
+    if previous:
+        print(f"\n(prev: {previous.get('commit') or '?'} @ {previous.get('timestamp')})")
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="오프라인 파이프라인 벤치마크 (가짜 네이버/Groq 서버)")
+    parser.add_argument('--iterations', type=int, default=20, help="단계별 반복 횟수")
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--naver-latency', type=float, default=0.05, help="네이버 응답 지연(초)")
+    parser.add_argument('--naver-error-rate', type=float, default=0.0)
+    parser.add_argument('--description-chars', type=int, default=200, help="기사 description 길이")
+    parser.add_argument('--llm-latency', type=float, default=0.3, help="LLM 응답 지연(초)")
+    parser.add_argument('--llm-jitter', type=float, default=0.1, help="LLM 지연에 더할 무작위 범위(초)")
+    parser.add_argument('--llm-error-rate', type=float, default=0.0, help="429 응답 비율")
+    parser.add_argument('--summary-chars', type=int, default=120, help="기사별 요약 길이 (응답 크기)")
+    parser.add_argument('--stream', action='store_true', help="analyze 단계를 스트리밍 모드로 측정")
+    parser.add_argument('--warm-cache', action='store_true', help="분석 캐시를 비우지 않음")
+    parser.add_argument('--no-save', action='store_true', help=f"{RESULTS_PATH} 에 저장하지 않음")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = {key: value for key, value in vars(args).items() if key not in ('no_save',)}
+
+    naver_config = FakeServerConfig(args.naver_latency, 0.0, args.naver_error_rate, seed=1)
+    llm_config = FakeServerConfig(args.llm_latency, args.llm_jitter, args.llm_error_rate, seed=2)
+    counter = LLMTokenCounter()
+    naver_server = start_server(make_naver_handler(naver_config, args.description_chars))
+    llm_server = start_server(make_llm_handler(llm_config, counter, args.summary_chars))
+
+    # 실제 키/서버로 요청이 나가지 않도록 더미 키 + 로컬 주소 (키와 클라이언트는 첫 요청 때 이 값으로 만들어짐)
+    os.environ['NAVER_CLIENT_ID'] = 'bench'
+    os.environ['NAVER_CLIENT_SECRET'] = 'bench'
+    os.environ['GROQ_API_KEY'] = 'bench'
+    os.environ['GROQ_BASE_URL'] = f"http://127.0.0.1:{llm_server.server_port}"
+    os.environ.pop('GEMINI_API_KEY', None)
+
+    import database
+    import fetcher
+    import llm_client
+    from analyzer import analyze_news, generate_briefing
+    from pipeline import process_news_data
+
+    fetcher.NAVER_NEWS_URL = f"http://127.0.0.1:{naver_server.server_port}/v1/search/news.json"
+    llm_client.configure_rate_limits(10 ** 6, 10 ** 9)  # 앱의 RPM/TPM 대기는 측정 대상에서 제외
+    llm_client.LLM_BACKOFF_BASE = 0.01  # 429 재시도 대기도 짧게
+
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    database.DB_PATH = db_path
+    database.init_db()
+
+    def clear_cache():
+        if not args.warm_cache:
+            with database.transaction() as conn:
+                conn.execute('DELETE FROM analysis_cache')
+
+    candidates = fetcher.fetch_naver_news_multi(display=CANDIDATES)
+    batch_date = "2026-01-01"
+    stage_fns = {
+        # 파이프라인과 같은 다중 쿼리 수집 (페이지 요청 + 중복 제거 포함)
+        'fetch': (lambda: len(asyncio.run(fetcher.fetch_naver_news_multi_async(display=CANDIDATES))), None),
+        'analyze': (lambda: len(analyze_news(candidates, on_result=(lambda item: None) if args.stream else None)),
+                    clear_cache),
+        'briefing': (lambda: len(candidates) if generate_briefing(candidates) else 0, None),
+        'process': (lambda: CANDIDATES if process_news_data(batch_date, full_refresh=True)['status'] == 'success' else 0,
+                    clear_cache),
+        # 가짜 서버의 기사는 매번 같으므로 새 기사가 없는 증분 새로고침 (배치가 없으면 첫 회만 전체 수집)
+        'refresh': (lambda: process_news_data(batch_date).get('items', 0), None),
+    }
+
+    results = {}
+    try:
+        for stage in args.stages:
+            fn, before_each = stage_fns[stage]
+            print(f"[Bench] {stage} x{args.iterations}...")
+            results[stage] = run_stage(stage, fn, args.iterations, counter, before_each)
+    finally:
+        database.close_connection()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+        naver_server.shutdown()
+        llm_server.shutdown()
+
+    previous = load_previous(config)
+    print_report(results, previous)
+    print(f"LLM client: {llm_client.get_llm_metrics()}")
+
+    if not args.no_save:
+        record = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'config': config,
+            'results': results,
+        }
+        with open(RESULTS_PATH, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        print(f"Saved to {RESULTS_PATH}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+import time
+import threading
+import database
+from database import migrate, cleanup_old_data, RETENTION_DAYS
+
+# 프로세스 단위 1회 초기화
+# Streamlit 은 세션 상호작용/상태 폴링마다 main.py 를 다시 실행하므로,
+# 스키마 확인과 보관 기간 정리를 스크립트 본문이 아니라 여기서 프로세스당 한 번만 수행
+RETENTION_CLEANUP_INTERVAL = 6 * 60 * 60  # 오래된 데이터 정리 주기(초)
+
+_lock = threading.Lock()
+_bootstrapped_path = None  # 초기화한 DB_PATH (바뀌면 다시 초기화)
+_cleanup_thread = None
+
+def bootstrap():
+    """
+    스키마 마이그레이션(최초 1회) + 보관 기간 정리 스레드 시작.
+    이미 초기화했으면 아무것도 하지 않으므로 매 rerun 마다 호출해도 됨.
+    """
+    global _bootstrapped_path, _cleanup_thread
+    if _bootstrapped_path == database.DB_PATH:
+        return
+    with _lock:
+        if _bootstrapped_path == database.DB_PATH:
+            return
+        migrate()
+        if _cleanup_thread is None:
+            _cleanup_thread = threading.Thread(target=_cleanup_loop, name="retention-cleanup", daemon=True)
+            _cleanup_thread.start()
+        _bootstrapped_path = database.DB_PATH
+
+def _cleanup_loop():
+    # 시작 직후 1회, 이후 RETENTION_CLEANUP_INTERVAL 마다 (첫 화면 렌더링을 막지 않도록 백그라운드에서)
+    while True:
+        cleanup_old_data(days_to_keep=RETENTION_DAYS)  # 오류는 내부에서 기록만 함
+        time.sleep(RETENTION_CLEANUP_INTERVAL)
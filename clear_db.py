@@ -1,7 +1,5 @@
-import sqlite3
 import datetime
-
-DB_PATH = 'daily_news.db'
+from database import delete_news_by_date
 
 def get_batch_date():
     # main.py와 동일한 로직
@@ -16,12 +14,8 @@ def clear_today():
     batch_date = get_batch_date()
     print(f"Clearing data for batch_date: {batch_date}")
     
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("DELETE FROM daily_news WHERE batch_date = ?", (batch_date,))
-    deleted_count = c.rowcount
-    conn.commit()
-    conn.close()
+    # delete_news_by_date 는 데이터 버전을 올리므로 실행 중인 앱/스케줄러의 조회 캐시도 갱신됨
+    deleted_count = delete_news_by_date(batch_date)
     
     print(f"Deleted {deleted_count} records.")
 
@@ -1,14 +1,121 @@
+import re
 import sqlite3
 import os
 import json
-from datetime import datetime, timedelta
+import time
+import queue
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
 
 DB_PATH = 'daily_news.db'
 
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    
+# --- Connection Pool ---
+# 프로세스 전체가 공유하는 커넥션 풀: 쓸 때만 빌리고 끝나면 반납
+# (Streamlit 은 rerun/fragment 마다 새 스레드에서 스크립트를 실행하므로, 스레드별 커넥션은
+#  rerun 마다 새로 열리고 닫히지 않음. 풀은 최대 POOL_SIZE 개만 열고 계속 재사용)
+# WAL 모드(분석 스레드가 쓰는 동안에도 다른 세션이 읽기 가능)는 DB 파일에 기록되므로 migrate() 에서 한 번만 설정
+BUSY_TIMEOUT_MS = 5000  # 잠금 대기 시간 (database is locked 방지)
+STATEMENT_CACHE_SIZE = 128  # 커넥션별 prepared statement 캐시 크기
+POOL_SIZE = 8  # 최대 커넥션 수 (모두 사용 중이면 반납될 때까지 대기)
+POOL_WAIT_SECONDS = 30  # 커넥션 대기 한도
+
+_pool_lock = threading.Lock()
+_pool = None  # queue.Queue: 유휴 커넥션 (None 은 아직 열지 않은 자리)
+_pool_path = None  # _pool 을 만든 DB_PATH (바뀌면 새 풀)
+_held = threading.local()  # 현재 스레드가 빌린 커넥션 (중첩 호출은 같은 커넥션 사용)
+
+def _connect():
+    conn = sqlite3.connect(
+        DB_PATH,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        check_same_thread=False  # 풀을 통해 여러 스레드가 번갈아 사용 (동시에는 한 스레드만)
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA synchronous=NORMAL')  # WAL에서는 NORMAL로도 안전
+    conn.execute('PRAGMA foreign_keys=ON')  # news_stock 행이 뉴스 삭제 시 함께 삭제되도록
+    return conn
+
+def _close_idle(pool):
+    if pool is None:
+        return
+    while True:
+        try:
+            conn = pool.get_nowait()
+        except queue.Empty:
+            return
+        if conn is not None:
+            conn.close()
+
+def _current_pool():
+    global _pool, _pool_path
+    with _pool_lock:
+        if _pool is None or _pool_path != DB_PATH:
+            _close_idle(_pool)  # 빌려 간 커넥션은 반납할 때 닫힘
+            _pool = queue.Queue(maxsize=POOL_SIZE)
+            for _ in range(POOL_SIZE):
+                _pool.put(None)
+            _pool_path = DB_PATH
+        return _pool
+
+@contextmanager
+def connection():
+    """풀에서 커넥션을 빌려 쓰고 반납 (같은 스레드에서 중첩 호출하면 바깥 커넥션을 그대로 사용)"""
+    conn = getattr(_held, 'conn', None)
+    if conn is not None:
+        yield conn
+        return
+
+    pool = _current_pool()
+    try:
+        conn = pool.get(timeout=POOL_WAIT_SECONDS)
+    except queue.Empty:
+        raise sqlite3.OperationalError(f"no free database connection after {POOL_WAIT_SECONDS}s")
+    try:
+        if conn is None:
+            conn = _connect()
+    except Exception:
+        pool.put(None)
+        raise
+
+    _held.conn = conn
+    try:
+        yield conn
+    finally:
+        _held.conn = None
+        if conn.in_transaction:
+            conn.rollback()  # 끝내지 않은 트랜잭션이 다음 사용자에게 넘어가지 않도록
+        if pool is _pool:
+            pool.put(conn)
+        else:
+            conn.close()  # DB_PATH 가 바뀌었거나 close_connection() 으로 버려진 풀
+
+def close_connection():
+    """풀의 커넥션을 모두 닫음 (DB 파일 삭제 전 등). 사용 중인 커넥션은 반납할 때 닫힘."""
+    global _pool, _pool_path
+    with _pool_lock:
+        _close_idle(_pool)
+        _pool = None
+        _pool_path = None
+
+@contextmanager
+def transaction():
+    """쓰기 트랜잭션: 정상 종료 시 commit, 예외 시 rollback"""
+    with connection() as conn:
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+# --- Schema Migrations ---
+# PRAGMA user_version 에 현재 스키마 버전을 기록하고, 그보다 높은 버전의 마이그레이션만 순서대로 적용
+# 새 스키마 변경은 _migration_N 함수를 추가하고 MIGRATIONS 끝에 등록
+
+def _migration_1(c):
+    """초기 스키마 (기존 DB는 이미 테이블이 있으므로 IF NOT EXISTS)"""
     # 뉴스 테이블
     c.execute('''
         CREATE TABLE IF NOT EXISTS daily_news (
@@ -36,33 +143,323 @@ def init_db():
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     ''')
+
+def _migration_2(c):
+    """batch_date 인덱스 (모든 조회/삭제가 batch_date 조건)"""
+    # (batch_date, created_at): 날짜별 조회 + MAX(created_at)을 인덱스만으로 처리
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_daily_news_batch_date
+        ON daily_news (batch_date, created_at)
+    ''')
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_daily_briefing_batch_date
+        ON daily_briefing (batch_date, created_at)
+    ''')
+
+def _migration_3(c):
+    """기사별 LLM 분석 결과 캐시 (새로고침 시 새 기사만 분석)"""
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS analysis_cache (
+            cache_key TEXT PRIMARY KEY,
+            result TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_analysis_cache_last_used
+        ON analysis_cache (last_used_at)
+    ''')
+
+def _migration_4(c):
+    """배치 분석 작업 임대(lease) 테이블: 여러 프로세스 중 한 곳만 같은 batch_date 를 분석"""
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS analysis_job (
+            batch_date TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            status TEXT NOT NULL,
+            message TEXT,
+            started_at REAL NOT NULL,
+            heartbeat_at REAL NOT NULL,
+            expires_at REAL NOT NULL,
+            finished_at REAL
+        )
+    ''')
+
+def _migration_5(c):
+    """조회 캐시 무효화용 데이터 버전 (다른 프로세스의 쓰기도 감지)"""
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS cache_meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+    ''')
+    c.execute("INSERT OR IGNORE INTO cache_meta (key, value) VALUES ('data_version', 0)")
+
+# 종목/테마 구분자 ("삼성전자, SK하이닉스" / "반도체·2차전지" 등)
+_NAME_SPLIT_RE = re.compile(r'\s*[,/·、]\s*')
+EMPTY_NAME_VALUES = ('없음', '해당 없음', '-', 'None')
+
+def split_names(text):
+    """LLM이 준 종목/테마 문자열(또는 리스트)을 이름 리스트로 (중복/빈 값/'없음' 제외)"""
+    if isinstance(text, (list, tuple)):
+        parts = [str(s) for s in text]
+    else:
+        parts = _NAME_SPLIT_RE.split(text or '')
+    names = []
+    for name in parts:
+        name = name.strip()
+        if name and name not in EMPTY_NAME_VALUES and name not in names:
+            names.append(name)
+    return names
+
+def _parse_keywords(keywords_raw):
+    """예전 keywords JSON 문자열 → (theme, stocks, comment)"""
+    try:
+        data = json.loads(keywords_raw or '{}')
+    except (TypeError, ValueError):
+        return '', '', keywords_raw or ''
+    if not isinstance(data, dict):
+        return '', '', keywords_raw or ''
+    stocks = data.get('stocks') or ''
+    if isinstance(stocks, (list, tuple)):
+        stocks = ', '.join(str(s) for s in stocks)
+    return data.get('theme') or '', stocks, data.get('comment') or ''
+
+def _migration_6(c):
+    """keywords JSON 을 theme/stocks/comment 컬럼과 종목 언급 테이블(news_stock)로 정규화 + 기존 행 백필"""
+    columns = {row[1] for row in c.execute('PRAGMA table_info(daily_news)')}
+    for column in ('theme', 'stocks', 'comment'):
+        if column not in columns:
+            c.execute(f'ALTER TABLE daily_news ADD COLUMN {column} TEXT')
     
-    conn.commit()
-    conn.close()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS news_stock (
+            news_id INTEGER NOT NULL REFERENCES daily_news(id) ON DELETE CASCADE,
+            stock_name TEXT NOT NULL,
+            PRIMARY KEY (news_id, stock_name)
+        )
+    ''')
+    # 종목 → 기사 조회용 (news_id 방향은 PK 인덱스 사용)
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_news_stock_stock_name
+        ON news_stock (stock_name, news_id)
+    ''')
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_daily_news_theme
+        ON daily_news (theme, batch_date)
+    ''')
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_daily_news_sentiment
+        ON daily_news (sentiment, batch_date)
+    ''')
+    
+    rows = c.execute('SELECT id, keywords FROM daily_news WHERE theme IS NULL').fetchall()
+    updates = []
+    mentions = []
+    for news_id, keywords_raw in rows:
+        theme, stocks, comment = _parse_keywords(keywords_raw)
+        updates.append((theme, stocks, comment, news_id))
+        mentions.extend((news_id, name) for name in split_names(stocks))
+    c.executemany('UPDATE daily_news SET theme = ?, stocks = ?, comment = ? WHERE id = ?', updates)
+    c.executemany('INSERT OR IGNORE INTO news_stock (news_id, stock_name) VALUES (?, ?)', mentions)
+
+def _migration_7(c):
+    """테마 → 기사 역색인 (news_stock 과 같은 구조) + 기존 행 백필"""
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS news_theme (
+            news_id INTEGER NOT NULL REFERENCES daily_news(id) ON DELETE CASCADE,
+            theme_name TEXT NOT NULL,
+            PRIMARY KEY (news_id, theme_name)
+        )
+    ''')
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_news_theme_theme_name
+        ON news_theme (theme_name, news_id)
+    ''')
+    
+    rows = c.execute('SELECT id, theme FROM daily_news').fetchall()
+    mentions = [(news_id, name) for news_id, theme in rows for name in split_names(theme)]
+    c.executemany('INSERT OR IGNORE INTO news_theme (news_id, theme_name) VALUES (?, ?)', mentions)
+
+def _migration_8(c):
+    """파이프라인 단계별 실행 지표 (수집/분석/브리핑/저장 시간, 기사 수, 토큰, 결과)"""
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS pipeline_metrics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id TEXT NOT NULL,
+            batch_date TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            started_at REAL NOT NULL,
+            duration_ms REAL NOT NULL,
+            items INTEGER,
+            prompt_tokens INTEGER NOT NULL DEFAULT 0,
+            completion_tokens INTEGER NOT NULL DEFAULT 0,
+            outcome TEXT NOT NULL,
+            error TEXT
+        )
+    ''')
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_pipeline_metrics_stage
+        ON pipeline_metrics (stage, started_at)
+    ''')
+
+def _migration_9(c):
+    """증분 수집 워터마크: 쿼리별 마지막으로 본 pubDate + 최근 본 기사 링크"""
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS fetch_watermark (
+            query TEXT PRIMARY KEY,
+            last_pub_ts REAL NOT NULL,
+            seen_links TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    ''')
+
+MIGRATIONS = [
+    (1, _migration_1),
+    (2, _migration_2),
+    (3, _migration_3),
+    (4, _migration_4),
+    (5, _migration_5),
+    (6, _migration_6),
+    (7, _migration_7),
+    (8, _migration_8),
+    (9, _migration_9),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version():
+    with connection() as conn:
+        return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def migrate(target_version=None):
+    """
+    스키마를 target_version(기본: 최신)까지 올립니다.
+    각 마이그레이션은 버전 기록과 함께 하나의 트랜잭션으로 적용됩니다.
+    Returns: 적용된 버전 번호 리스트
+    """
+    if target_version is None:
+        target_version = SCHEMA_VERSION
+    
+    with connection() as conn:
+        # WAL 은 DB 파일에 기록되는 설정이라 커넥션마다가 아니라 여기서 한 번만
+        conn.execute('PRAGMA journal_mode=WAL')
+        if get_schema_version() >= target_version:
+            return []  # 이미 최신이면 쓰기 잠금 없이 종료
+        
+        applied = []
+        for version, migration in MIGRATIONS:
+            if version > target_version:
+                break
+            # 다른 프로세스가 동시에 마이그레이션하지 않도록 쓰기 잠금 후 버전 재확인
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                if conn.execute('PRAGMA user_version').fetchone()[0] >= version:
+                    conn.rollback()
+                    continue
+                migration(conn.cursor())
+                conn.execute(f'PRAGMA user_version = {version}')
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            applied.append(version)
     
-    # DB 초기화 시 오래된 데이터 정리 (7일)
-    cleanup_old_data(days_to_keep=7)
+    if applied:
+        print(f"[Migration] Applied schema versions: {applied}")
+    return applied
+
+# --- Dashboard Read Cache ---
+# 뉴스/브리핑을 쓰는 함수는 _data_write() 로 데이터 버전을 올리고,
+# 대시보드 조회는 (버전, batch_date) 가 같으면 메모리 스냅샷을 그대로 반환
+DB_VERSION_CHECK_INTERVAL = 2  # 다른 프로세스(스케줄러 등)의 쓰기를 확인하는 주기(초)
+
+_version_lock = threading.Lock()
+_local_data_version = 0  # 이 프로세스의 쓰기 횟수
+_db_data_version = None  # 마지막으로 확인한 DB 데이터 버전
+_db_version_checked_at = 0.0
+_snapshot_cache = {}  # batch_date -> (버전, 스냅샷)
+
+@contextmanager
+def _data_write():
+    """뉴스/브리핑 쓰기 트랜잭션. 실제로 바뀐 행이 있을 때만 커밋과 함께 데이터 버전을 올림."""
+    global _local_data_version
+    with transaction() as conn:
+        changes_before = conn.total_changes
+        yield conn
+        if conn.total_changes == changes_before:
+            return  # 지울 것이 없던 정리 작업 등: 캐시를 무효화하지 않음
+        conn.execute("UPDATE cache_meta SET value = value + 1 WHERE key = 'data_version'")
+    with _version_lock:
+        _local_data_version += 1
+
+def get_data_version():
+    """현재 데이터 버전 (로컬 쓰기 횟수, DB 버전). DB는 DB_VERSION_CHECK_INTERVAL 마다만 조회."""
+    global _db_data_version, _db_version_checked_at
+    now = time.monotonic()
+    if _db_data_version is None or now - _db_version_checked_at >= DB_VERSION_CHECK_INTERVAL:
+        with connection() as conn:
+            row = conn.execute(
+                "SELECT value FROM cache_meta WHERE key = 'data_version'"
+            ).fetchone()
+        _db_data_version = row[0] if row else 0
+        _db_version_checked_at = now
+    return (_local_data_version, _db_data_version)
+
+def get_dashboard_snapshot(batch_date):
+    """
+    대시보드에 필요한 데이터를 한 번에 조회 (프로세스 내 모든 세션이 공유하는 캐시)
+    Returns: {'news': [...], 'briefing': dict|None, 'last_update': datetime|None}
+    반환값은 공유 객체이므로 수정하지 말 것.
+    """
+    version = get_data_version()
+    cached = _snapshot_cache.get(batch_date)
+    if cached and cached[0] == version:
+        return cached[1]
+    
+    # 세 조회를 한 커넥션의 읽기 트랜잭션으로 묶어 같은 시점의 DB 를 봄
+    # (사이에 다른 프로세스의 publish_batch 가 끼면 새 뉴스 + 이전 브리핑 같은 섞인 스냅샷이 캐시됨)
+    with connection() as conn:
+        started = not conn.in_transaction
+        if started:
+            conn.execute('BEGIN')
+        snapshot = {
+            'news': get_news_by_date(batch_date),
+            'briefing': get_briefing_by_date(batch_date),
+            'last_update': get_last_update_time(batch_date),
+        }
+        if started:
+            conn.commit()
+    with _version_lock:
+        # 조회 중에 쓰기가 있었으면 다음 호출에서 다시 조회되도록 조회 전 버전으로 저장
+        _snapshot_cache[batch_date] = (version, snapshot)
+    return snapshot
+
+RETENTION_DAYS = 7  # 뉴스/브리핑/지표 보관 기간(일)
+
+def init_db():
+    """스키마 최신화 + 오래된 데이터 정리 (앱/스케줄러는 bootstrap.bootstrap() 으로 프로세스당 1회 실행)"""
+    migrate()
+    cleanup_old_data(days_to_keep=RETENTION_DAYS)
 
-def cleanup_old_data(days_to_keep=7):
+def cleanup_old_data(days_to_keep=RETENTION_DAYS):
     """지정된 기간(일)보다 오래된 데이터를 삭제합니다."""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        
         # 기준 날짜 계산 (오늘 - 7일)
         cutoff_date = (datetime.now() - timedelta(days=days_to_keep)).strftime("%Y-%m-%d")
         
         # 기준 날짜보다 이전(작은) 날짜의 데이터 삭제
         # batch_date 형식은 YYYY-MM-DD 이므로 문자열 비교 가능
-        
-        c.execute("DELETE FROM daily_news WHERE batch_date < ?", (cutoff_date,))
-        news_deleted = c.rowcount
-        
-        c.execute("DELETE FROM daily_briefing WHERE batch_date < ?", (cutoff_date,))
-        briefing_deleted = c.rowcount
-        
-        conn.commit()
-        conn.close()
+        with _data_write() as conn:
+            c = conn.cursor()
+            
+            c.execute("DELETE FROM daily_news WHERE batch_date < ?", (cutoff_date,))
+            news_deleted = c.rowcount
+            
+            c.execute("DELETE FROM daily_briefing WHERE batch_date < ?", (cutoff_date,))
+            briefing_deleted = c.rowcount
+            
+            c.execute("DELETE FROM pipeline_metrics WHERE batch_date < ?", (cutoff_date,))
         
         if news_deleted > 0 or briefing_deleted > 0:
             print(f"[Cleanup] Deleted old data before {cutoff_date}: News({news_deleted}), Briefing({briefing_deleted})")
@@ -71,23 +468,116 @@ def cleanup_old_data(days_to_keep=7):
         print(f"[Cleanup] Error during cleanup: {e}")
 
 def get_news_by_date(batch_date):
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute('SELECT * FROM daily_news WHERE batch_date = ?', (batch_date,))
-    rows = c.fetchall()
+    with connection() as conn:
+        rows = conn.execute('SELECT * FROM daily_news WHERE batch_date = ?', (batch_date,)).fetchall()
     news_list = [dict(row) for row in rows]
-    conn.close()
     return news_list
 
+def get_news_by_stock(stock_name, start_date=None, end_date=None, sentiment=None):
+    """
+    종목을 언급한 뉴스 (news_stock 인덱스 사용, 최신순)
+    예) get_news_by_stock('삼성전자', start_date='2026-10-12', sentiment='호재')
+    start_date / end_date: batch_date 범위 (포함)
+    """
+    query = '''
+        SELECT n.* FROM news_stock s
+        JOIN daily_news n ON n.id = s.news_id
+        WHERE s.stock_name = ?
+    '''
+    params = [stock_name]
+    if start_date:
+        query += ' AND n.batch_date >= ?'
+        params.append(start_date)
+    if end_date:
+        query += ' AND n.batch_date <= ?'
+        params.append(end_date)
+    if sentiment:
+        query += ' AND n.sentiment = ?'
+        params.append(sentiment)
+    query += ' ORDER BY n.batch_date DESC, n.id'
+    
+    with connection() as conn:
+        rows = conn.execute(query, params).fetchall()
+    return [dict(row) for row in rows]
+
+# --- Stock / Theme Index ---
+# news_stock / news_theme 역색인으로 보존 기간(cleanup_old_data) 안의 종목/테마 언급을 조회
+INDEX_TABLES = {
+    'stock': ('news_stock', 'stock_name'),
+    'theme': ('news_theme', 'theme_name'),
+}
+SEARCH_WINDOW_DAYS = 7  # 검색 기본 기간 (보존 기간과 같음)
+
+def _window_start(days):
+    return (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+
+def search_index(query, days=SEARCH_WINDOW_DAYS, limit=10):
+    """
+    이름이 query 로 시작하는 종목/테마 (언급 많은 순)
+    Returns: [{'kind': 'stock'|'theme', 'name': str, 'count': int}]
+    """
+    query = (query or '').strip()
+    if not query:
+        return []
+    
+    with connection() as conn:
+        start_date = _window_start(days)
+        results = []
+        for kind, (table, column) in INDEX_TABLES.items():
+            # 범위 조건으로 접두어 검색 (LIKE 와 달리 (name, news_id) 인덱스를 그대로 사용)
+            rows = conn.execute(f'''
+                SELECT i.{column} AS name, COUNT(*) AS count
+                FROM {table} i
+                JOIN daily_news n ON n.id = i.news_id
+                WHERE i.{column} >= ? AND i.{column} < ? AND n.batch_date >= ?
+                GROUP BY i.{column}
+            ''', (query, query + '\U0010ffff', start_date)).fetchall()
+            results.extend({'kind': kind, 'name': row['name'], 'count': row['count']} for row in rows)
+    
+    results.sort(key=lambda r: (-r['count'], r['name']))
+    return results[:limit]
+
+def get_mention_summary(name, kind='stock', days=SEARCH_WINDOW_DAYS, latest_limit=5):
+    """
+    종목/테마의 최근 언급 요약
+    Returns: {'kind', 'name', 'count', 'sentiment': {감성: 건수}, 'latest': [최신 기사 dict]}
+    """
+    table, column = INDEX_TABLES[kind]
+    with connection() as conn:
+        start_date = _window_start(days)
+    
+        sentiment_rows = conn.execute(f'''
+            SELECT n.sentiment AS sentiment, COUNT(*) AS count
+            FROM {table} i
+            JOIN daily_news n ON n.id = i.news_id
+            WHERE i.{column} = ? AND n.batch_date >= ?
+            GROUP BY n.sentiment
+        ''', (name, start_date)).fetchall()
+        sentiment = {}
+        for row in sentiment_rows:
+            key = row['sentiment'] or '중립'
+            sentiment[key] = sentiment.get(key, 0) + row['count']
+    
+        latest_rows = conn.execute(f'''
+            SELECT n.* FROM {table} i
+            JOIN daily_news n ON n.id = i.news_id
+            WHERE i.{column} = ? AND n.batch_date >= ?
+            ORDER BY n.batch_date DESC, n.id DESC
+            LIMIT ?
+        ''', (name, start_date, latest_limit)).fetchall()
+    
+    return {
+        'kind': kind,
+        'name': name,
+        'count': sum(sentiment.values()),
+        'sentiment': sentiment,
+        'latest': [dict(row) for row in latest_rows],
+    }
+
 def get_briefing_by_date(batch_date):
     """해당 날짜의 브리핑 조회"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute('SELECT * FROM daily_briefing WHERE batch_date = ?', (batch_date,))
-    row = c.fetchone()
-    conn.close()
+    with connection() as conn:
+        row = conn.execute('SELECT * FROM daily_briefing WHERE batch_date = ?', (batch_date,)).fetchone()
     if row:
         briefing = dict(row)
         # hot_keywords JSON 파싱
@@ -103,82 +593,116 @@ def save_briefing(briefing_data, batch_date):
     if not briefing_data:
         return
     
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    with _data_write() as conn:
+        conn.execute('''
+            INSERT OR REPLACE INTO daily_briefing (batch_date, mood, mood_label, summary, hot_keywords)
+            VALUES (?, ?, ?, ?, ?)
+        ''', _briefing_row(briefing_data, batch_date))
+
+def _news_rows(news_items, batch_date):
+    rows = []
+    for item in news_items:
+        rows.append((
+            batch_date,
+            item.get('title'),
+            item.get('originallink') or item.get('url') or item.get('link'),
+            item.get('pub_date'),
+            item.get('summary'),
+            item.get('sentiment'),
+            item.get('keywords'),
+            item.get('theme'),
+            item.get('stocks'),
+            item.get('comment')
+        ))
+    return rows
+
+def _insert_news(conn, news_items, batch_date):
+    """뉴스 행 + 종목/테마 역색인(news_stock, news_theme) 삽입. 쓰기 트랜잭션 안에서만 호출."""
+    rows = _news_rows(news_items, batch_date)
+    if not rows:
+        return
+    conn.executemany('''
+        INSERT INTO daily_news (batch_date, title, url, pub_date, summary, sentiment, keywords, theme, stocks, comment)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
     
+    # 같은 트랜잭션이 쓰기 잠금을 쥐고 있으므로 이 batch_date 의 가장 큰 id N개가 방금 넣은 행 (삽입 순)
+    new_ids = [row[0] for row in conn.execute(
+        'SELECT id FROM daily_news WHERE batch_date = ? ORDER BY id DESC LIMIT ?',
+        (batch_date, len(rows))
+    )][::-1]
+    # 종목/테마 역색인도 같은 트랜잭션에서 갱신 (row[7]: theme, row[8]: stocks)
+    stock_mentions = []
+    theme_mentions = []
+    for news_id, row in zip(new_ids, rows):
+        stock_mentions.extend((news_id, name) for name in split_names(row[8]))
+        theme_mentions.extend((news_id, name) for name in split_names(row[7]))
+    conn.executemany('INSERT OR IGNORE INTO news_stock (news_id, stock_name) VALUES (?, ?)', stock_mentions)
+    conn.executemany('INSERT OR IGNORE INTO news_theme (news_id, theme_name) VALUES (?, ?)', theme_mentions)
+
+def _briefing_row(briefing_data, batch_date):
     hot_keywords = briefing_data.get('hot_keywords', [])
     if isinstance(hot_keywords, list):
         hot_keywords = json.dumps(hot_keywords, ensure_ascii=False)
-    
-    c.execute('''
-        INSERT OR REPLACE INTO daily_briefing (batch_date, mood, mood_label, summary, hot_keywords)
-        VALUES (?, ?, ?, ?, ?)
-    ''', (
+    return (
         batch_date,
         briefing_data.get('mood', ''),
         briefing_data.get('mood_label', ''),
         briefing_data.get('summary', ''),
         hot_keywords
-    ))
-    
-    conn.commit()
-    conn.close()
+    )
 
 def save_news(news_items, batch_date):
     """뉴스 저장"""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    
-    for item in news_items:
-        c.execute('''
-            INSERT INTO daily_news (batch_date, title, url, pub_date, summary, sentiment, keywords)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            batch_date,
-            item.get('title'),
-            item.get('originallink') or item.get('url') or item.get('link'),
-            item.get('pub_date'),
-            item.get('summary'),
-            item.get('sentiment'),
-            item.get('keywords')
-        ))
-    
-    conn.commit()
-    conn.close()
+    with _data_write() as conn:
+        _insert_news(conn, news_items, batch_date)
+
+def publish_batch(news_items, briefing_data, batch_date, watermarks=None, lease_owner=None):
+    """
+    batch_date 의 뉴스/브리핑을 하나의 트랜잭션으로 통째로 교체.
+    읽는 쪽은 교체 전 배치 또는 교체 후 배치만 보게 됨 (빈 화면 없음).
+    watermarks: 이 배치를 만든 수집의 워터마크 (배치와 함께 커밋되어야 새 기사를 잃지 않음)
+    lease_owner: 지정하면 같은 트랜잭션에서 작업 임대를 아직 갖고 있는지 확인하고, 다른 프로세스가
+                 인계받았으면 LeaseLostError (하트비트가 끊긴 작업이 새 작업의 결과를 덮어쓰지 않도록)
+    """
+    with _data_write() as conn:
+        if lease_owner is not None:
+            conn.execute('BEGIN IMMEDIATE')  # 확인과 쓰기 사이에 임대가 넘어가지 않도록 쓰기 잠금부터
+            _check_job_lease(conn, batch_date, lease_owner)
+        _save_watermarks(conn, watermarks)
+        conn.execute("DELETE FROM daily_news WHERE batch_date = ?", (batch_date,))
+        conn.execute("DELETE FROM daily_briefing WHERE batch_date = ?", (batch_date,))
+        _insert_news(conn, news_items, batch_date)
+        if briefing_data:
+            conn.execute('''
+                INSERT INTO daily_briefing (batch_date, mood, mood_label, summary, hot_keywords)
+                VALUES (?, ?, ?, ?, ?)
+            ''', _briefing_row(briefing_data, batch_date))
 
 def delete_news_by_date(batch_date):
-    """해당 날짜의 뉴스와 브리핑 삭제"""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("DELETE FROM daily_news WHERE batch_date = ?", (batch_date,))
-    c.execute("DELETE FROM daily_briefing WHERE batch_date = ?", (batch_date,))
-    conn.commit()
-    conn.close()
+    """해당 날짜의 뉴스와 브리핑 삭제. Returns: 삭제한 뉴스 수"""
+    with _data_write() as conn:
+        deleted = conn.execute("DELETE FROM daily_news WHERE batch_date = ?", (batch_date,)).rowcount
+        conn.execute("DELETE FROM daily_briefing WHERE batch_date = ?", (batch_date,))
+    return deleted
 
 def get_last_update_time(batch_date):
     """해당 날짜의 가장 최신 created_at 시간 반환 (뉴스 또는 브리핑 중 최신, KST 변환)"""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    
-    # 뉴스 테이블에서 최신 시간
-    c.execute('''
-        SELECT MAX(created_at) as last_update 
-        FROM daily_news 
-        WHERE batch_date = ?
-    ''', (batch_date,))
-    news_row = c.fetchone()
+    with connection() as conn:
+        # 뉴스 테이블에서 최신 시간
+        news_row = conn.execute('''
+            SELECT MAX(created_at) as last_update 
+            FROM daily_news 
+            WHERE batch_date = ?
+        ''', (batch_date,)).fetchone()
     
-    # 브리핑 테이블에서 최신 시간
-    c.execute('''
-        SELECT MAX(created_at) as last_update 
-        FROM daily_briefing 
-        WHERE batch_date = ?
-    ''', (batch_date,))
-    briefing_row = c.fetchone()
-    
-    conn.close()
+        # 브리핑 테이블에서 최신 시간
+        briefing_row = conn.execute('''
+            SELECT MAX(created_at) as last_update 
+            FROM daily_briefing 
+            WHERE batch_date = ?
+        ''', (batch_date,)).fetchone()
     
-    from datetime import timedelta
     KST_OFFSET = timedelta(hours=9)  # UTC+9
     
     def parse_datetime(dt_str):
@@ -202,3 +726,219 @@ def get_last_update_time(batch_date):
     if news_time and briefing_time:
         return max(news_time, briefing_time)
     return news_time or briefing_time
+
+
+# --- Analysis Cache ---
+ANALYSIS_CACHE_TTL_HOURS = 72  # 분석 결과 유효 시간
+ANALYSIS_CACHE_MAX_ENTRIES = 2000  # 초과 시 가장 오래 안 쓰인 항목부터 삭제
+
+def _cache_cutoff():
+    """TTL 기준 시각 (created_at 은 CURRENT_TIMESTAMP = UTC 로 저장됨)"""
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=ANALYSIS_CACHE_TTL_HOURS)
+    return cutoff.strftime("%Y-%m-%d %H:%M:%S")
+
+def get_cached_analyses(cache_keys):
+    """
+    캐시 키 목록에 대한 분석 결과 조회 (TTL 지난 항목 제외)
+    Returns: {cache_key: dict}
+    """
+    if not cache_keys:
+        return {}
+    
+    placeholders = ','.join('?' * len(cache_keys))
+    cutoff = _cache_cutoff()
+    
+    with transaction() as conn:
+        rows = conn.execute(f'''
+            SELECT cache_key, result FROM analysis_cache
+            WHERE cache_key IN ({placeholders}) AND created_at >= ?
+        ''', (*cache_keys, cutoff)).fetchall()
+        
+        hits = {}
+        for row in rows:
+            try:
+                hits[row['cache_key']] = json.loads(row['result'])
+            except:
+                continue
+        
+        # LRU 갱신
+        if hits:
+            hit_keys = list(hits)
+            conn.execute(f'''
+                UPDATE analysis_cache SET last_used_at = CURRENT_TIMESTAMP
+                WHERE cache_key IN ({','.join('?' * len(hit_keys))})
+            ''', hit_keys)
+    return hits
+
+def save_cached_analyses(entries):
+    """
+    분석 결과 저장 후 TTL/용량 기준으로 정리
+    entries: {cache_key: dict}
+    """
+    if not entries:
+        return
+    
+    cutoff = _cache_cutoff()
+    
+    with transaction() as conn:
+        conn.executemany('''
+            INSERT OR REPLACE INTO analysis_cache (cache_key, result)
+            VALUES (?, ?)
+        ''', [(key, json.dumps(value, ensure_ascii=False)) for key, value in entries.items()])
+        
+        # 1. 만료 항목 삭제
+        conn.execute("DELETE FROM analysis_cache WHERE created_at < ?", (cutoff,))
+        
+        # 2. 최대 개수 초과분 삭제 (가장 오래 안 쓰인 순)
+        conn.execute('''
+            DELETE FROM analysis_cache WHERE cache_key IN (
+                SELECT cache_key FROM analysis_cache
+                ORDER BY last_used_at DESC
+                LIMIT -1 OFFSET ?
+            )
+        ''', (ANALYSIS_CACHE_MAX_ENTRIES,))
+
+
+# --- Analysis Job Lease ---
+# status: running / success / error. running 이라도 expires_at 이 지나면 죽은 작업으로 보고 인계 가능
+
+def acquire_job_lease(batch_date, owner, lease_seconds):
+    """
+    batch_date 작업 임대 획득 시도. 다른 owner 가 유효한 running 임대를 갖고 있으면 False.
+    """
+    now = time.time()
+    with connection() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT owner, status, expires_at FROM analysis_job WHERE batch_date = ?', (batch_date,)
+            ).fetchone()
+            if row and row['status'] == 'running' and row['expires_at'] > now and row['owner'] != owner:
+                conn.rollback()
+                return False
+        
+            conn.execute('''
+                INSERT OR REPLACE INTO analysis_job
+                    (batch_date, owner, status, message, started_at, heartbeat_at, expires_at, finished_at)
+                VALUES (?, ?, 'running', NULL, ?, ?, ?, NULL)
+            ''', (batch_date, owner, now, now, now + lease_seconds))
+            conn.commit()
+            return True
+        except Exception:
+            conn.rollback()
+            raise
+
+class LeaseLostError(Exception):
+    """작업 임대를 다른 owner 가 가져감"""
+
+def _check_job_lease(conn, batch_date, owner):
+    row = conn.execute(
+        "SELECT owner FROM analysis_job WHERE batch_date = ? AND owner = ? AND status = 'running'",
+        (batch_date, owner)
+    ).fetchone()
+    if row is None:
+        raise LeaseLostError(f"{batch_date} job lease is no longer held by {owner}")
+
+def renew_job_lease(batch_date, owner, lease_seconds):
+    """하트비트: 임대 연장. 이미 다른 owner 에게 넘어갔으면 False."""
+    now = time.time()
+    with transaction() as conn:
+        cursor = conn.execute('''
+            UPDATE analysis_job SET heartbeat_at = ?, expires_at = ?
+            WHERE batch_date = ? AND owner = ? AND status = 'running'
+        ''', (now, now + lease_seconds, batch_date, owner))
+        return cursor.rowcount > 0
+
+def release_job_lease(batch_date, owner, status, message=None):
+    """작업 종료 기록 (status: success / error)"""
+    now = time.time()
+    with transaction() as conn:
+        conn.execute('''
+            UPDATE analysis_job SET status = ?, message = ?, finished_at = ?, expires_at = ?
+            WHERE batch_date = ? AND owner = ?
+        ''', (status, message, now, now, batch_date, owner))
+
+def get_job(batch_date):
+    """batch_date 작업 상태 조회. 만료된 running 작업은 status 를 'expired' 로 반환."""
+    with connection() as conn:
+        row = conn.execute(
+            'SELECT * FROM analysis_job WHERE batch_date = ?', (batch_date,)
+        ).fetchone()
+    if not row:
+        return None
+    job = dict(row)
+    if job['status'] == 'running' and job['expires_at'] <= time.time():
+        job['status'] = 'expired'
+    return job
+
+
+# --- Pipeline Metrics ---
+# 실행(run_id) 1건 = 단계별 행 여러 개 + stage='total' 행 1개
+
+PIPELINE_METRIC_COLUMNS = (
+    'run_id', 'batch_date', 'stage', 'started_at', 'duration_ms',
+    'items', 'prompt_tokens', 'completion_tokens', 'outcome', 'error'
+)
+
+def save_pipeline_metrics(rows):
+    """rows: PIPELINE_METRIC_COLUMNS 키를 가진 dict 리스트 (뉴스 데이터가 아니므로 데이터 버전은 그대로)"""
+    if not rows:
+        return
+    with transaction() as conn:
+        conn.executemany(f'''
+            INSERT INTO pipeline_metrics ({", ".join(PIPELINE_METRIC_COLUMNS)})
+            VALUES ({", ".join("?" for _ in PIPELINE_METRIC_COLUMNS)})
+        ''', [tuple(row.get(column) for column in PIPELINE_METRIC_COLUMNS) for row in rows])
+
+def get_pipeline_metrics(run_limit=50):
+    """최근 run_limit 번 실행의 단계별 지표 (최신 실행부터, 실행 안에서는 시작 순)"""
+    with connection() as conn:
+        rows = conn.execute('''
+            SELECT m.* FROM pipeline_metrics m
+            JOIN (
+                SELECT run_id, started_at AS run_started_at FROM pipeline_metrics
+                WHERE stage = 'total'
+                ORDER BY started_at DESC
+                LIMIT ?
+            ) runs USING (run_id)
+            ORDER BY runs.run_started_at DESC, m.id
+        ''', (run_limit,)).fetchall()
+    return [dict(row) for row in rows]
+
+
+# --- Fetch Watermarks ---
+# 쿼리별 {'last_pub_ts': 마지막으로 본 기사의 pubDate(epoch 초), 'seen_links': 최근 본 링크 리스트(최신순)}
+
+def get_fetch_watermarks(queries):
+    """Returns: {query: watermark} (기록이 없는 쿼리는 빠짐)"""
+    if not queries:
+        return {}
+    placeholders = ','.join('?' * len(queries))
+    with connection() as conn:
+        rows = conn.execute(
+            f'SELECT query, last_pub_ts, seen_links FROM fetch_watermark WHERE query IN ({placeholders})',
+            list(queries)
+        ).fetchall()
+    return {
+        row['query']: {'last_pub_ts': row['last_pub_ts'], 'seen_links': json.loads(row['seen_links'])}
+        for row in rows
+    }
+
+def save_fetch_watermarks(watermarks):
+    """새 기사가 없어 배치를 바꾸지 않을 때 워터마크만 저장 (배치를 바꿀 때는 publish_batch 에 함께 전달)"""
+    if not watermarks:
+        return
+    with transaction() as conn:
+        _save_watermarks(conn, watermarks)
+
+def _save_watermarks(conn, watermarks):
+    if not watermarks:
+        return
+    now = time.time()
+    conn.executemany('''
+        INSERT OR REPLACE INTO fetch_watermark (query, last_pub_ts, seen_links, updated_at)
+        VALUES (?, ?, ?, ?)
+    ''', [
+        (query, mark['last_pub_ts'], json.dumps(mark['seen_links'], ensure_ascii=False), now)
+        for query, mark in watermarks.items()
+    ])
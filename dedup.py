@@ -0,0 +1,157 @@
+import re
+import hashlib
+
+# 같은 통신사 기사를 여러 언론사가 재게재한 경우를 걸러내기 위한 SimHash 기반 유사 중복 제거
+SIMHASH_BITS = 64
+SHINGLE_SIZE = 3  # 한국어는 띄어쓰기가 불규칙하므로 글자 3-gram 사용
+DEDUP_SIMILARITY = 0.8  # SimHash 유사도(1 - 해밍거리/64)가 이 값 이상이면 같은 기사로 판단
+
+_NON_WORD_RE = re.compile(r'[^\w]+')
+_BRACKET_RE = re.compile(r'\[[^\]]*\]|\([^)]*\)')  # [단독], (서울=연합뉴스) 같은 머리말
+
+def normalize_text(text):
+    """비교용 정규화: 괄호 머리말/특수문자/공백 제거 + 소문자"""
+    text = _BRACKET_RE.sub(' ', text or '')
+    return _NON_WORD_RE.sub('', text).lower()
+
+def _shingles(text):
+    if len(text) <= SHINGLE_SIZE:
+        return [text] if text else []
+    return [text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)]
+
+def _hash64(token):
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'big')
+
+# 비트 자리별 1의 개수를 정수 덧셈 한 번으로 세기 위한 표:
+# 해시의 i번째 비트를 큰 정수의 i번째 _COUNTER_WIDTH 비트 칸으로 펼친 값 (바이트 단위로 미리 계산)
+_COUNTER_WIDTH = 32  # 칸 하나가 셀 수 있는 shingle 수 < 2^32
+_COUNTER_MASK = (1 << _COUNTER_WIDTH) - 1
+_T0, _T1, _T2, _T3, _T4, _T5, _T6, _T7 = [
+    [sum(((byte >> bit) & 1) << ((8 * position + bit) * _COUNTER_WIDTH) for bit in range(8)) for byte in range(256)]
+    for position in range(SIMHASH_BITS // 8)
+]
+
+def simhash(text):
+    """정규화된 텍스트의 64비트 SimHash"""
+    shingles = _shingles(normalize_text(text))
+    if not shingles:
+        return 0
+
+    # 펼친 해시를 모두 더하면 칸마다 그 비트 자리의 1의 개수가 쌓임
+    counters = 0
+    for shingle in shingles:
+        h = _hash64(shingle)
+        counters += (_T0[h & 0xFF] + _T1[(h >> 8) & 0xFF] + _T2[(h >> 16) & 0xFF] + _T3[(h >> 24) & 0xFF]
+                     + _T4[(h >> 32) & 0xFF] + _T5[(h >> 40) & 0xFF] + _T6[(h >> 48) & 0xFF] + _T7[(h >> 56) & 0xFF])
+    half = len(shingles) / 2
+    value = 0
+    for bit in range(SIMHASH_BITS):
+        if (counters >> (bit * _COUNTER_WIDTH)) & _COUNTER_MASK > half:
+            value |= 1 << bit
+    return value
+
+def hamming_distance(a, b):
+    return (a ^ b).bit_count()
+
+def max_distance_for(similarity):
+    """유사도 기준 → 허용 해밍 거리 (0.8 → 12비트)"""
+    return int(SIMHASH_BITS * (1 - similarity))
+
+class SimHashIndex:
+    """
+    LSH 인덱스: 64비트를 (max_distance + 1)개 밴드로 나눔.
+    해밍 거리가 max_distance 이하인 두 해시는 비둘기집 원리로 최소 한 밴드가 같으므로,
+    밴드 값이 같은 후보만 비교하면 됨.
+    """
+    def __init__(self, max_distance):
+        self.max_distance = max_distance
+        self._band_count = max_distance + 1
+        self._band_width = -(-SIMHASH_BITS // self._band_count)  # 올림
+        self._bands = [{} for _ in range(self._band_count)]
+        self._hashes = {}
+
+    def _band_keys(self, value):
+        mask = (1 << self._band_width) - 1
+        return [(value >> (i * self._band_width)) & mask for i in range(self._band_count)]
+
+    def add(self, key, value):
+        self._hashes[key] = value
+        for band, band_key in zip(self._bands, self._band_keys(value)):
+            band.setdefault(band_key, []).append(key)
+
+    def query(self, value):
+        """해밍 거리가 max_distance 이하인 키 목록 (가까운 순)"""
+        candidates = set()
+        for band, band_key in zip(self._bands, self._band_keys(value)):
+            candidates.update(band.get(band_key, ()))
+
+        matches = []
+        for key in candidates:
+            distance = hamming_distance(value, self._hashes[key])
+            if distance <= self.max_distance:
+                matches.append((distance, key))
+        return [key for _, key in sorted(matches)]
+
+def _item_text(item):
+    # 수집한 기사는 description, DB 에 저장된 배치 기사는 summary
+    return item.get('title', '') + ' ' + (item.get('description') or item.get('summary') or '')
+
+def deduplicate_news(news_list, threshold=DEDUP_SIMILARITY, limit=None):
+    """
+    제목+내용이 거의 같은 기사 묶음에서 첫 번째(우선순위가 가장 높은) 기사만 남김.
+    남은 기사에는 흡수한 중복 수를 'duplicate_count' 로 기록.
+    threshold: 같은 기사로 볼 최소 유사도 (None 이면 중복 제거하지 않음)
+    limit: 대표 기사가 이만큼 모이면 나머지는 보지 않고 중단
+           (뒤쪽 기사는 어차피 버려지므로 SimHash 계산을 생략. duplicate_count 는 그때까지 본 기사 기준)
+    """
+    if threshold is None:
+        return news_list if limit is None else news_list[:limit]
+
+    index = SimHashIndex(max_distance_for(threshold))
+    representatives = []
+    scanned = 0
+    for item in news_list:
+        if limit is not None and len(representatives) >= limit:
+            break
+        scanned += 1
+        value = simhash(_item_text(item))
+        matches = index.query(value)
+        if matches:
+            representatives[matches[0]]['duplicate_count'] += 1
+            continue
+        item['duplicate_count'] = 0
+        index.add(len(representatives), value)
+        representatives.append(item)
+
+    removed = scanned - len(representatives)
+    if removed:
+        print(f"[Dedup] {removed} near-duplicate articles merged into {len(representatives)}")
+    return representatives
+
+def drop_known_duplicates(news_list, known_items, threshold=DEDUP_SIMILARITY):
+    """
+    known_items(이미 게시된 배치 등) 중 하나와 거의 같은 기사를 news_list 에서 제거.
+    증분 수집의 새 기사가 기존 배치 기사의 재게재일 때 다시 분석/게시하지 않도록.
+    저장된 배치에는 원문 description 대신 LLM 요약(summary)이 있어 제목+내용만으로는 잘 안 맞으므로,
+    제목+내용 또는 제목만 비교해서 하나라도 기준 이상이면 같은 기사로 봄.
+    threshold: 같은 기사로 볼 최소 유사도 (None 이면 제거하지 않음)
+    """
+    if threshold is None or not news_list or not known_items:
+        return news_list
+
+    max_distance = max_distance_for(threshold)
+    by_text = SimHashIndex(max_distance)
+    by_title = SimHashIndex(max_distance)
+    for position, item in enumerate(known_items):
+        by_text.add(position, simhash(_item_text(item)))
+        by_title.add(position, simhash(item.get('title', '')))
+
+    fresh = [
+        item for item in news_list
+        if not by_title.query(simhash(item.get('title', ''))) and not by_text.query(simhash(_item_text(item)))
+    ]
+
+    removed = len(news_list) - len(fresh)
+    if removed:
+        print(f"[Dedup] {removed} articles already in the batch (near-duplicate) skipped")
+    return fresh
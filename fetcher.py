@@ -1,6 +1,14 @@
 import os
+import asyncio
+import httpx
 import requests
 import re
+import html
+import threading
+import concurrent.futures
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from dedup import deduplicate_news, DEDUP_SIMILARITY
 from dotenv import load_dotenv
 
 try:
@@ -20,14 +28,15 @@ def get_secret(key):
         return value
     
     # 2. Streamlit Secrets 확인 (배포 환경)
-    if st and hasattr(st, 'secrets') and key in st.secrets:
-        return st.secrets[key]
+    try:
+        if st and hasattr(st, 'secrets') and key in st.secrets:
+            return st.secrets[key]
+    except Exception:
+        # secrets.toml 이 없으면 조회 자체가 예외
+        pass
     
     return None
 
-NAVER_CLIENT_ID = get_secret('NAVER_CLIENT_ID')
-NAVER_CLIENT_SECRET = get_secret('NAVER_CLIENT_SECRET')
-
 # 검색할 때 쓸 알짜 키워드 (우선순위 높은 뉴스)
 TARGET_KEYWORDS = [
     "단독", "체결", "수주", "인수", "합병", "공시", 
@@ -43,59 +52,167 @@ EXCLUDE_KEYWORDS = [
     "오늘의 운세", "날씨", "기자수첩"
 ]
 
+_TAG_RE = re.compile('<.*?>')
+
 def clean_html(raw_html):
-    cleanr = re.compile('<.*?>')
-    cleantext = re.sub(cleanr, '', raw_html)
-    return cleantext.replace('&quot;', '"').replace('&lt;', '<').replace('&gt;', '>').replace('&amp;', '&')
+    # 태그/엔티티가 없는 경우가 많으므로 필요할 때만 처리
+    if '<' in raw_html:
+        raw_html = _TAG_RE.sub('', raw_html)
+    if '&' in raw_html:
+        raw_html = html.unescape(raw_html)
+    return raw_html
+
+class KeywordMatcher:
+    """
+    타겟/제외 키워드를 하나의 정규식으로 컴파일해서 한 번의 스캔으로 둘 다 찾음 (대소문자 무시)
+    - 텍스트는 한 번만 소문자로 바꾸고, 매칭 위치 바로 다음부터 다시 찾아서 겹치는 키워드도 놓치지 않음
+    """
+    def __init__(self, target_keywords, exclude_keywords):
+        self.target_keywords = list(target_keywords)
+        self.exclude_keywords = list(exclude_keywords)
+        
+        # 소문자 키워드 → (타겟 여부, 제외 여부)
+        self._kinds = {}
+        for keyword in self.target_keywords:
+            self._kinds.setdefault(keyword.lower(), [False, False])[0] = True
+        for keyword in self.exclude_keywords:
+            self._kinds.setdefault(keyword.lower(), [False, False])[1] = True
+        
+        # 긴 키워드부터 시도하므로, 같은 위치에서 시작하는 짧은 키워드(접두어)는 따로 기록
+        self._prefixes = {
+            keyword: [other for other in self._kinds if keyword.startswith(other)]
+            for keyword in self._kinds
+        }
+        
+        alternatives = sorted(self._kinds, key=len, reverse=True)
+        if alternatives:
+            self._pattern = re.compile('|'.join(re.escape(keyword) for keyword in alternatives))
+        else:
+            self._pattern = None
+
+    def match(self, text):
+        """Returns: (매칭된 타겟 키워드 set, 매칭된 제외 키워드 set) - 소문자 기준"""
+        targets = set()
+        excludes = set()
+        if self._pattern is None:
+            return targets, excludes
+        
+        text = text.lower()
+        search = self._pattern.search
+        found = search(text)
+        while found:
+            for keyword in self._prefixes[found.group()]:
+                is_target, is_exclude = self._kinds[keyword]
+                if is_target:
+                    targets.add(keyword)
+                if is_exclude:
+                    excludes.add(keyword)
+            found = search(text, found.start() + 1)
+        return targets, excludes
+
+    def match_article(self, title, description):
+        return self.match(title + " " + description)
+
+_matcher_lock = threading.Lock()
+_matcher = KeywordMatcher(TARGET_KEYWORDS, EXCLUDE_KEYWORDS)
+
+def get_keyword_matcher():
+    return _matcher
+
+def set_keywords(target_keywords=None, exclude_keywords=None):
+    """실행 중 키워드 목록 교체 (새 매처를 만들어 통째로 바꾸므로 동시 조회에 안전)"""
+    global _matcher
+    with _matcher_lock:
+        if target_keywords is not None:
+            TARGET_KEYWORDS[:] = target_keywords
+        if exclude_keywords is not None:
+            EXCLUDE_KEYWORDS[:] = exclude_keywords
+        _matcher = KeywordMatcher(TARGET_KEYWORDS, EXCLUDE_KEYWORDS)
+    return _matcher
 
 def should_exclude(title, description):
     """제외 키워드가 포함된 뉴스인지 확인"""
-    text = (title + " " + description).lower()
-    for keyword in EXCLUDE_KEYWORDS:
-        if keyword.lower() in text:
-            return True
-    return False
+    return bool(_matcher.match_article(title, description)[1])
 
 def has_target_keyword(title, description):
     """타겟 키워드가 포함된 뉴스인지 확인"""
-    text = (title + " " + description).lower()
-    for keyword in TARGET_KEYWORDS:
-        if keyword.lower() in text:
-            return True
-    return False
+    return bool(_matcher.match_article(title, description)[0])
 
-def fetch_naver_news(query="경제", display=10):
-    """
-    네이버 뉴스 API에서 뉴스를 가져오고 필터링
-    - 제외 키워드가 포함된 뉴스는 제거
-    - 타겟 키워드가 포함된 뉴스를 우선 정렬
-    """
-    url = "https://openapi.naver.com/v1/search/news.json"
-    headers = {
-        "X-Naver-Client-Id": NAVER_CLIENT_ID,
-        "X-Naver-Client-Secret": NAVER_CLIENT_SECRET
-    }
-    # 더 많이 가져와서 필터링 후 원하는 개수만 반환
-    params = {
+NAVER_NEWS_URL = "https://openapi.naver.com/v1/search/news.json"
+NAVER_MAX_DISPLAY = 100  # API 1회 최대 결과 수
+NAVER_MAX_START = 1000  # API start 파라미터 최대값
+FETCH_MAX_WORKERS = 8  # 동시 요청 수
+FETCH_TIMEOUT = 10  # 요청당 타임아웃(초)
+INCREMENTAL_PAGE_SIZE = 20  # 워터마크가 있는 쿼리의 첫 요청 크기 (새 기사가 적으면 이 1번으로 끝)
+INCREMENTAL_MAX_PAGES = 5  # 워터마크에 닿을 때까지 따라갈 최대 페이지 수 (이후 페이지는 NAVER_MAX_DISPLAY 개씩)
+WATERMARK_MAX_LINKS = 300  # 쿼리별로 기억할 최근 기사 링크 수
+
+# 여러 쿼리로 후보 뉴스 수집 (기본 "경제" + 타겟 키워드별 쿼리)
+SEARCH_QUERIES = ["경제"] + [f"경제 {keyword}" for keyword in TARGET_KEYWORDS]
+
+_session = None
+
+def get_session():
+    """keep-alive 커넥션을 재사용하는 공용 Session (동시 요청 수만큼 풀 확보)"""
+    global _session
+    if _session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=FETCH_MAX_WORKERS)
+        session.mount("https://", adapter)
+        session.headers.update(_auth_headers())
+        _session = session
+    return _session
+
+_auth = None
+
+def _auth_headers():
+    """네이버 API 인증 헤더 (첫 요청 때 키 조회: Streamlit Secrets 파싱을 import 시점에서 제외)"""
+    global _auth
+    if _auth is None:
+        _auth = {
+            "X-Naver-Client-Id": get_secret('NAVER_CLIENT_ID') or "",
+            "X-Naver-Client-Secret": get_secret('NAVER_CLIENT_SECRET') or ""
+        }
+    return dict(_auth)
+
+def _page_params(query, start, display):
+    return {
         "query": query,
-        "display": min(display * 3, 100),  # 필터링 여유분 확보
+        "display": min(display, NAVER_MAX_DISPLAY),
+        "start": start,
         "sort": "date"  # 최신순
     }
-    
-    response = requests.get(url, headers=headers, params=params)
+
+def _fetch_page(query, start=1, display=NAVER_MAX_DISPLAY):
+    """네이버 뉴스 검색 1페이지 요청 (최신순)"""
+    response = get_session().get(NAVER_NEWS_URL, params=_page_params(query, start, display), timeout=FETCH_TIMEOUT)
     response.raise_for_status()
-    data = response.json()
-    
-    items = []
+    return response.json().get('items', [])
+
+def _pub_timestamp(item):
+    try:
+        # 네이버 응답은 pubDate, _filter_and_rank 결과는 pub_date
+        return parsedate_to_datetime(item.get('pubDate') or item['pub_date']).timestamp()
+    except Exception:
+        return 0
+
+def _filter_and_rank(raw_items, display, dedup_threshold=DEDUP_SIMILARITY):
+    """
+    - 제외 키워드가 포함된 뉴스는 제거
+    - 타겟 키워드가 포함된 뉴스를 우선 정렬
+    - 같은 기사 재게재(유사 중복)는 대표 1건만 남김
+    """
     target_items = []  # 타겟 키워드 포함 뉴스
     normal_items = []  # 일반 뉴스
+    matcher = get_keyword_matcher()
     
-    for item in data.get('items', []):
+    for item in raw_items:
         title = clean_html(item['title'])
         description = clean_html(item['description'])
+        targets, excludes = matcher.match_article(title, description)
         
         # 제외 키워드 필터링
-        if should_exclude(title, description):
+        if excludes:
             continue
         
         news_item = {
@@ -107,13 +224,204 @@ def fetch_naver_news(query="경제", display=10):
         }
         
         # 타겟 키워드 포함 여부에 따라 분류
-        if has_target_keyword(title, description):
+        if targets:
             target_items.append(news_item)
         else:
             normal_items.append(news_item)
     
     # 타겟 키워드 뉴스 우선, 나머지는 일반 뉴스
-    items = target_items + normal_items
+    # 요청한 개수만큼 대표 기사가 모이면 중복 검사를 멈춤 (수집 결과가 많을 때 SimHash 계산이 대부분)
+    return deduplicate_news(target_items + normal_items, dedup_threshold, limit=display)
+
+def fetch_naver_news(query="경제", display=10, pages=1, dedup_threshold=DEDUP_SIMILARITY):
+    """
+    네이버 뉴스 API에서 뉴스를 가져오고 필터링
+    - 제외 키워드가 포함된 뉴스는 제거
+    - 타겟 키워드가 포함된 뉴스를 우선 정렬
+    pages: 여러 페이지(start=1, 101, ...)를 가져올 때 사용
+    dedup_threshold: 유사 중복으로 볼 최소 SimHash 유사도 (None 이면 중복 제거 안 함)
+    """
+    if pages > 1:
+        return fetch_naver_news_multi([query], display=display, pages=pages, dedup_threshold=dedup_threshold)
+    
+    # 더 많이 가져와서 필터링 후 원하는 개수만 반환
+    raw_items = _fetch_page(query, display=display * 3)  # 필터링 여유분 확보
+    return _filter_and_rank(raw_items, display, dedup_threshold)
+
+def fetch_naver_news_multi(queries=None, display=10, pages=1, per_page=NAVER_MAX_DISPLAY,
+                           dedup_threshold=DEDUP_SIMILARITY):
+    """
+    여러 쿼리 x 여러 페이지를 동시에 요청해서 합친 뒤 필터링
+    - originallink 기준 중복 제거, 최신순 정렬 후 fetch_naver_news와 같은 필터/우선순위 적용
+    - 일부 요청이 실패해도 나머지 결과로 진행 (전부 실패하면 예외)
+    """
+    requests_to_send = _page_requests(queries, pages, per_page)
+    
+    pages_by_request = {}
+    errors = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(FETCH_MAX_WORKERS, len(requests_to_send))) as executor:
+        futures = {
+            executor.submit(_fetch_page, query, start, per_page): (query, start)
+            for query, start in requests_to_send
+        }
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                pages_by_request[futures[future]] = future.result()
+            except Exception as e:
+                print(f"[Fetch] {futures[future]} failed: {e}")
+                errors.append(e)
+    
+    return _merge_pages(requests_to_send, pages_by_request, errors, display, dedup_threshold)
+
+async def fetch_naver_news_multi_async(queries=None, display=10, pages=1, per_page=NAVER_MAX_DISPLAY,
+                                       dedup_threshold=DEDUP_SIMILARITY):
+    """fetch_naver_news_multi 의 asyncio 버전 (httpx 비동기 클라이언트, 동시 요청은 FETCH_MAX_WORKERS 개)"""
+    requests_to_send = _page_requests(queries, pages, per_page)
+    semaphore = asyncio.Semaphore(FETCH_MAX_WORKERS)
+    
+    async with httpx.AsyncClient(headers=_auth_headers(), timeout=FETCH_TIMEOUT) as http:
+        async def fetch(query, start):
+            async with semaphore:
+                response = await http.get(NAVER_NEWS_URL, params=_page_params(query, start, per_page))
+                response.raise_for_status()
+                return response.json().get('items', [])
+        
+        results = await asyncio.gather(
+            *(fetch(query, start) for query, start in requests_to_send),
+            return_exceptions=True
+        )
+    
+    pages_by_request = {}
+    errors = []
+    for key, result in zip(requests_to_send, results):
+        if isinstance(result, Exception):
+            print(f"[Fetch] {key} failed: {result}")
+            errors.append(result)
+        else:
+            pages_by_request[key] = result
+    
+    return _merge_pages(requests_to_send, pages_by_request, errors, display, dedup_threshold)
+
+async def fetch_naver_news_incremental_async(watermarks, queries=None, display=10,
+                                             dedup_threshold=DEDUP_SIMILARITY):
+    """
+    쿼리별 워터마크(마지막으로 본 pubDate + 최근 본 링크) 이후의 새 기사만 수집 (sort=date 이므로 최신부터)
+    - 워터마크가 있는 쿼리: INCREMENTAL_PAGE_SIZE 개부터 요청해서, 워터마크보다 오래된 기사가 나올 때까지만 다음 페이지
+    - 워터마크가 없는 쿼리: fetch_naver_news_multi_async 와 같이 1페이지(NAVER_MAX_DISPLAY 개) 전체
+    새 기사는 fetch_naver_news_multi_async 와 같은 병합/필터/우선순위를 거쳐 display 개까지 반환.
+    워터마크는 호출하는 쪽에서 결과를 반영한 뒤 저장 (실패하면 같은 기사를 다시 받도록)
+    Returns: (새 기사 리스트, {query: 갱신된 워터마크}) - 요청이 실패한 쿼리는 워터마크가 빠짐
+    """
+    queries = queries or SEARCH_QUERIES
+    semaphore = asyncio.Semaphore(FETCH_MAX_WORKERS)
+    request_count = 0
+    
+    async with httpx.AsyncClient(headers=_auth_headers(), timeout=FETCH_TIMEOUT) as http:
+        async def fetch(query, start, display):
+            nonlocal request_count
+            async with semaphore:
+                request_count += 1
+                response = await http.get(NAVER_NEWS_URL, params=_page_params(query, start, display))
+                response.raise_for_status()
+                return response.json().get('items', [])
+        
+        async def fetch_query(query):
+            watermark = watermarks.get(query)
+            if watermark is None:
+                page = await fetch(query, 1, NAVER_MAX_DISPLAY)
+                return page, _next_watermark(None, page, page)
+            
+            seen = set(watermark['seen_links'])
+            fetched = []
+            new_items = []
+            start, size = 1, INCREMENTAL_PAGE_SIZE
+            for _ in range(INCREMENTAL_MAX_PAGES):
+                page = await fetch(query, start, size)
+                fetched.extend(page)
+                reached_seen = False
+                for item in page:
+                    if _pub_timestamp(item) < watermark['last_pub_ts']:
+                        reached_seen = True  # 이후는 모두 이미 본 시점보다 오래된 기사
+                        break
+                    if _item_link(item) not in seen:
+                        new_items.append(item)
+                if reached_seen or len(page) < size:
+                    break
+                start += size
+                size = NAVER_MAX_DISPLAY
+                if start + size - 1 > NAVER_MAX_START:
+                    break
+            return new_items, _next_watermark(watermark, fetched, new_items)
+        
+        results = await asyncio.gather(*(fetch_query(query) for query in queries), return_exceptions=True)
+    
+    pages_by_request = {}
+    next_watermarks = {}
+    errors = []
+    requests_to_send = [(query, 1) for query in queries]
+    for key, result in zip(requests_to_send, results):
+        if isinstance(result, Exception):
+            print(f"[Fetch] {key[0]} failed: {result}")
+            errors.append(result)
+            continue
+        pages_by_request[key], next_watermarks[key[0]] = result
+    
+    print(f"[Fetch] incremental: {sum(len(items) for items in pages_by_request.values())} new articles, "
+          f"{request_count} requests for {len(queries)} queries")
+    return _merge_pages(requests_to_send, pages_by_request, errors, display, dedup_threshold), next_watermarks
+
+def _item_link(item):
+    return item.get('originallink') or item.get('link')
+
+def _next_watermark(watermark, fetched, new_items):
+    """받은 페이지 기준으로 워터마크 갱신: 가장 최신 pubDate + 새 링크를 앞에 붙인 최근 링크 목록"""
+    last_pub_ts = max([_pub_timestamp(item) for item in fetched] + [watermark['last_pub_ts'] if watermark else 0])
+    new_links = [_item_link(item) for item in sorted(new_items, key=_pub_timestamp, reverse=True)]
+    seen_links = list(dict.fromkeys(
+        link for link in new_links + (watermark['seen_links'] if watermark else []) if link
+    ))
+    return {'last_pub_ts': last_pub_ts, 'seen_links': seen_links[:WATERMARK_MAX_LINKS]}
+
+def release_from_watermarks(watermarks, items):
+    """
+    처리하지 못한 기사(분석 실패 등)를 워터마크에서 되돌려 다음 수집에서 새 기사로 다시 받도록 함:
+    링크를 seen_links 에서 빼고 last_pub_ts 를 그 기사의 pubDate 이하로 내림.
+    기사가 어느 쿼리에서 왔는지 모르므로 모든 쿼리에 적용 (그 사이 이미 본 기사는 seen_links 로 걸러짐)
+    Returns: 새 워터마크 dict
+    """
+    if not items or not watermarks:
+        return watermarks
+    links = {_item_link(item) for item in items}
+    oldest_pub_ts = min(_pub_timestamp(item) for item in items)
+    return {
+        query: {
+            'last_pub_ts': min(mark['last_pub_ts'], oldest_pub_ts),
+            'seen_links': [link for link in mark['seen_links'] if link not in links],
+        }
+        for query, mark in watermarks.items()
+    }
+
+def _page_requests(queries, pages, per_page):
+    """(쿼리, start) 요청 목록"""
+    return [
+        (query, start)
+        for query in (queries or SEARCH_QUERIES)
+        for start in range(1, min(pages * per_page, NAVER_MAX_START) + 1, per_page)
+    ]
+
+def _merge_pages(requests_to_send, pages_by_request, errors, display, dedup_threshold):
+    """페이지 결과를 합쳐서 필터링 (전부 실패하면 예외)"""
+    if errors and len(errors) == len(requests_to_send):
+        raise errors[0]
+    
+    # 요청 순서대로 합치면서 원문 링크 기준 중복 제거
+    merged = {}
+    for key in requests_to_send:
+        for item in pages_by_request.get(key, []):
+            link = _item_link(item)
+            if link and link not in merged:
+                merged[link] = item
     
-    # 요청한 개수만큼만 반환
-    return items[:display]
+    raw_items = sorted(merged.values(), key=_pub_timestamp, reverse=True)
+    print(f"[Fetch] {len(requests_to_send)} requests, {len(raw_items)} unique articles")
+    return _filter_and_rank(raw_items, display, dedup_threshold)
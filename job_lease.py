@@ -0,0 +1,66 @@
+import os
+import uuid
+import socket
+import threading
+from database import acquire_job_lease, renew_job_lease, release_job_lease
+
+# 배치 분석 단일 실행(single-flight) 임대
+# 여러 프로세스/서버가 같은 DB를 쓸 때 한 곳만 batch_date 분석을 수행하고 나머지는 상태만 따라감
+LEASE_SECONDS = 60  # 하트비트가 끊긴 뒤 다른 프로세스가 인계받기까지의 시간
+HEARTBEAT_INTERVAL = 15  # 임대 연장 주기(초)
+
+def make_owner_id():
+    """프로세스 + 인스턴스 단위 고유 ID"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+class JobLease:
+    def __init__(self, batch_date, owner=None, lease_seconds=LEASE_SECONDS, heartbeat_interval=HEARTBEAT_INTERVAL):
+        self.batch_date = batch_date
+        self.owner = owner or make_owner_id()
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = heartbeat_interval
+        self.lost = False  # 하트비트 실패 (다른 프로세스가 인계받음)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def acquire(self):
+        return acquire_job_lease(self.batch_date, self.owner, self.lease_seconds)
+
+    def start_heartbeat(self):
+        self._thread = threading.Thread(target=self._heartbeat, name=f"lease-{self.batch_date}", daemon=True)
+        self._thread.start()
+
+    def _heartbeat(self):
+        while not self._stop.wait(self.heartbeat_interval):
+            try:
+                if not renew_job_lease(self.batch_date, self.owner, self.lease_seconds):
+                    self.lost = True
+                    print(f"[Lease] {self.batch_date} lease lost by {self.owner}")
+                    return
+            except Exception as e:
+                # 일시적 DB 오류는 다음 주기에 재시도 (임대 만료 전까지 여유 있음)
+                print(f"[Lease] heartbeat error: {e}")
+
+    def release(self, status, message=None):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        if not self.lost:
+            release_job_lease(self.batch_date, self.owner, status, message)
+
+def run_with_lease(lease, fn, *args, **kwargs):
+    """
+    이미 획득한 임대를 하트비트로 유지하면서 fn 실행 후 결과 상태로 임대 반환.
+    fn 은 process_news_data 처럼 {"status": ..., "message": ...} 를 반환해야 하고,
+    lease_owner 키워드를 받아 결과를 쓰는 트랜잭션에서 임대 소유를 확인해야 함 (publish_batch)
+    """
+    lease.start_heartbeat()
+    try:
+        result = fn(*args, lease_owner=lease.owner, **kwargs)
+    except Exception as e:
+        lease.release('error', str(e))
+        raise
+    if lease.lost:
+        print(f"[Lease] {lease.batch_date} finished after losing the lease: {result.get('status')}")
+    lease.release(result.get('status', 'success'), result.get('message'))
+    return result
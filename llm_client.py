@@ -0,0 +1,255 @@
+import time
+import random
+import asyncio
+import threading
+from groq import APIConnectionError, APIStatusError, RateLimitError
+from prompt_builder import estimate_messages_tokens
+from pipeline_metrics import record_llm_usage
+
+# Groq 호출 공용 계층: 분당 요청/토큰 한도(토큰 버킷) + 재시도(지수 백오프, retry-after 준수) + 호출별 마감 시간
+# 분석 청크/브리핑/여러 새로고침이 동시에 호출해도 한도 안에서 줄을 서서 기다리도록 함 (프로세스 단위)
+GROQ_REQUESTS_PER_MINUTE = 30  # RPM 한도
+GROQ_TOKENS_PER_MINUTE = 12000  # TPM 한도 (요청마다 예상 토큰을 예약, 응답 usage 로 정산)
+LLM_MAX_RETRIES = 4  # 재시도 횟수 (첫 시도 제외)
+LLM_BACKOFF_BASE = 1.0  # 첫 재시도 대기(초), 이후 2배씩
+LLM_BACKOFF_MAX = 20.0  # 재시도 대기 상한(초)
+LLM_CALL_DEADLINE = 90.0  # 호출 1건의 전체 마감 시간(초): 대기 + 재시도 포함
+CLIENT_MAX_RETRIES = 0  # SDK 자체 재시도는 끄고 이 모듈에서 재시도
+
+class LLMDeadlineExceeded(TimeoutError):
+    """대기/재시도 중 호출 마감 시간을 넘김"""
+
+class TokenBucket:
+    """
+    용량 capacity, 초당 refill_rate 만큼 차는 토큰 버킷.
+    reserve() 는 바로 차감(음수 허용)하고 기다려야 할 시간을 돌려줌 → 먼저 예약한 호출이 먼저 실행됨
+    """
+    def __init__(self, capacity, refill_rate):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.refill_rate)
+        self._updated_at = now
+
+    def reserve(self, amount):
+        amount = min(amount, self.capacity)  # 한 번에 용량보다 많이 요청하면 영원히 못 채우므로 제한
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= amount
+            return max(0.0, -self._tokens / self.refill_rate)
+
+    def refund(self, amount):
+        """예약했지만 쓰지 않은 양 반환 (실제 사용량이 추정보다 적을 때)"""
+        if amount <= 0:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+class RateLimiter:
+    """RPM/TPM 토큰 버킷 + 429 응답 시 전체 호출 일시 정지"""
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60)
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens):
+        """요청 1건 + tokens 예약. Returns: 실행 전 기다려야 할 시간(초)"""
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        with self._lock:
+            return max(wait, self._paused_until - time.monotonic())
+
+    def pause(self, seconds):
+        """서버가 한도 초과(429)를 알리면 다른 호출도 그동안 보내지 않음"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+class LLMMetrics:
+    """호출/대기/재시도 누적 지표 (get_llm_metrics 로 조회)"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.succeeded = 0
+            self.failed = 0
+            self.retries = 0
+            self.rate_limited = 0  # 429 응답 수
+            self.deadline_exceeded = 0
+            self.queue_wait_total = 0.0  # 한도 때문에 기다린 시간 합(초)
+            self.queue_wait_max = 0.0
+            self.backoff_total = 0.0  # 재시도 대기 시간 합(초)
+
+    def record(self, **deltas):
+        with self._lock:
+            for name, value in deltas.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def record_queue_wait(self, seconds):
+        with self._lock:
+            self.queue_wait_total += seconds
+            self.queue_wait_max = max(self.queue_wait_max, seconds)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'succeeded': self.succeeded,
+                'failed': self.failed,
+                'retries': self.retries,
+                'rate_limited': self.rate_limited,
+                'deadline_exceeded': self.deadline_exceeded,
+                'queue_wait_total': round(self.queue_wait_total, 3),
+                'queue_wait_avg': round(self.queue_wait_total / self.calls, 3) if self.calls else 0.0,
+                'queue_wait_max': round(self.queue_wait_max, 3),
+                'backoff_total': round(self.backoff_total, 3),
+            }
+
+_limiter = RateLimiter(GROQ_REQUESTS_PER_MINUTE, GROQ_TOKENS_PER_MINUTE)
+_metrics = LLMMetrics()
+
+def get_llm_metrics():
+    return _metrics.snapshot()
+
+def configure_rate_limits(requests_per_minute=GROQ_REQUESTS_PER_MINUTE, tokens_per_minute=GROQ_TOKENS_PER_MINUTE):
+    """한도 변경 (요금제가 다르거나 벤치마크처럼 한도 없이 돌릴 때). 진행 중인 예약은 초기화됨"""
+    global _limiter
+    _limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+
+def _is_retryable(error):
+    if isinstance(error, (RateLimitError, APIConnectionError)):  # APITimeoutError 포함
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code in (408, 409) or error.status_code >= 500
+    return False
+
+def _retry_after(error):
+    """429/503 응답의 retry-after 헤더(초). 없거나 날짜 형식이면 None"""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    try:
+        return max(0.0, float(response.headers.get('retry-after')))
+    except (TypeError, ValueError):
+        return None
+
+def _backoff_delay(attempt, error):
+    """지수 백오프 + full jitter. retry-after 가 있으면 그 이상 기다림"""
+    delay = random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+    retry_after = _retry_after(error)
+    if retry_after is not None:
+        delay = retry_after + random.uniform(0, LLM_BACKOFF_BASE)
+    return delay
+
+def _estimate_request_tokens(params):
+    """예상 토큰을 따로 주지 않은 호출: 입력 추정치 + max_tokens"""
+    return estimate_messages_tokens(params.get('messages', [])) + params.get('max_tokens', 0)
+
+def _settle_tokens(reserved, completion):
+    """응답의 실제 사용량(usage)이 예약보다 적으면 차이를 반환 (스트리밍은 usage 가 없어 예약 유지)"""
+    usage = getattr(completion, 'usage', None)
+    record_usage(usage)
+    total = getattr(usage, 'total_tokens', None) if usage else None
+    if total is not None:
+        _limiter.tokens.refund(reserved - total)
+
+def record_usage(usage):
+    """응답 usage 의 prompt/completion 토큰을 현재 파이프라인 단계 지표에 더함"""
+    if usage is not None:
+        record_llm_usage(getattr(usage, 'prompt_tokens', 0), getattr(usage, 'completion_tokens', 0))
+
+def chunk_usage(chunk):
+    """스트림 조각의 usage (Groq 는 마지막 조각의 x_groq.usage 로 전체 사용량을 보냄)"""
+    return getattr(chunk, 'usage', None) or getattr(getattr(chunk, 'x_groq', None), 'usage', None)
+
+class _Call:
+    """호출 1건의 마감 시간/시도 상태"""
+    def __init__(self, params, expected_tokens, deadline):
+        self.params = params
+        self.tokens = expected_tokens or _estimate_request_tokens(params)
+        self.deadline = time.monotonic() + (deadline or LLM_CALL_DEADLINE)
+        self.attempt = 0
+        _metrics.record(calls=1)
+
+    def remaining(self):
+        return self.deadline - time.monotonic()
+
+    def check_wait(self, wait, reason):
+        if wait >= self.remaining():
+            _metrics.record(deadline_exceeded=1, failed=1)
+            raise LLMDeadlineExceeded(f"LLM call would exceed deadline while {reason} ({wait:.1f}s)")
+
+    def request_kwargs(self):
+        # 남은 시간을 이번 시도의 HTTP 타임아웃으로 사용
+        return dict(self.params, timeout=max(1.0, self.remaining()))
+
+    def handle_error(self, error):
+        """재시도할 경우 대기 시간, 아니면 예외를 그대로 다시 발생"""
+        if isinstance(error, RateLimitError):
+            _metrics.record(rate_limited=1)
+        if not _is_retryable(error) or self.attempt >= LLM_MAX_RETRIES:
+            _metrics.record(failed=1)
+            raise error
+        delay = _backoff_delay(self.attempt, error)
+        _limiter.tokens.refund(self.tokens)  # 실패한 시도의 토큰 예약은 다음 시도에서 다시 함
+        if isinstance(error, RateLimitError):
+            _limiter.pause(delay)
+        self.check_wait(delay, "backing off")
+        self.attempt += 1
+        _metrics.record(retries=1, backoff_total=delay)
+        print(f"[LLM] {type(error).__name__}, retry {self.attempt}/{LLM_MAX_RETRIES} in {delay:.1f}s")
+        return delay
+
+    def reserve(self):
+        wait = _limiter.reserve(self.tokens)
+        try:
+            self.check_wait(wait, "waiting for rate limit")
+        except LLMDeadlineExceeded:
+            _limiter.tokens.refund(self.tokens)
+            raise
+        _metrics.record_queue_wait(wait)
+        return wait
+
+def chat_completion(client, expected_tokens=None, deadline=None, **params):
+    """
+    client.chat.completions.create(**params) 를 한도/재시도/마감 시간 안에서 호출 (동기)
+    expected_tokens: TPM 한도에 예약할 토큰 수 (없으면 입력 추정치 + max_tokens)
+    deadline: 대기/재시도를 포함한 전체 마감 시간(초, 기본 LLM_CALL_DEADLINE)
+    stream=True 이면 스트림 생성까지만 재시도 (이미 받은 조각은 되돌릴 수 없으므로)
+    """
+    call = _Call(params, expected_tokens, deadline)
+    while True:
+        wait = call.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            completion = client.chat.completions.create(**call.request_kwargs())
+        except Exception as e:
+            time.sleep(call.handle_error(e))
+            continue
+        _metrics.record(succeeded=1)
+        _settle_tokens(call.tokens, completion)
+        return completion
+
+async def chat_completion_async(async_client, expected_tokens=None, deadline=None, **params):
+    """chat_completion 의 asyncio 버전 (AsyncGroq)"""
+    call = _Call(params, expected_tokens, deadline)
+    while True:
+        wait = call.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        try:
+            completion = await async_client.chat.completions.create(**call.request_kwargs())
+        except Exception as e:
+            await asyncio.sleep(call.handle_error(e))
+            continue
+        _metrics.record(succeeded=1)
+        _settle_tokens(call.tokens, completion)
+        return completion
@@ -0,0 +1,438 @@
+import time
+import asyncio
+import weakref
+import threading
+import contextvars
+import collections
+import concurrent.futures
+from groq import Groq, AsyncGroq
+from pipeline_metrics import record_llm_usage, percentile
+from llm_client import (
+    chat_completion, chat_completion_async, record_usage, chunk_usage, CLIENT_MAX_RETRIES, LLM_CALL_DEADLINE
+)
+
+try:
+    import google.generativeai as genai
+except ImportError:
+    genai = None
+
+# 여러 LLM 제공자(Groq, Gemini)를 같은 인터페이스로 묶고, 작업(analysis/briefing)별 지연 시간을 보고 라우팅
+GROQ_MODEL = "llama-3.3-70b-versatile"
+GEMINI_MODEL = "gemini-2.0-flash"
+LATENCY_WINDOW = 50  # 제공자/모델/작업별로 기억할 최근 호출 수
+MIN_SAMPLES = 3  # 이보다 기록이 적으면 지연 시간으로 순위를 매기지 않음 (설정 순서 유지)
+MAX_ERROR_RATE = 0.5  # 최근 오류율이 이보다 높으면 비정상으로 보고 후순위로
+UNHEALTHY_COOLDOWN = 60  # 마지막 오류 후 이 시간(초)이 지나면 다시 정상 후보로
+HEDGE_PERCENTILE = 95  # 1순위 응답이 이 백분위 지연을 넘기면 2순위에 같은 요청을 한 번 더 보냄
+HEDGE_MAX_WORKERS = 8  # 동기 호출의 hedge 요청용 스레드 수
+
+class LatencyStats:
+    """최근 LATENCY_WINDOW 건의 (지연 시간, 성공 여부)"""
+    def __init__(self):
+        self._samples = collections.deque(maxlen=LATENCY_WINDOW)
+        self.last_error_at = 0.0
+
+    def record(self, seconds, ok):
+        self._samples.append((seconds, ok))
+        if not ok:
+            self.last_error_at = time.monotonic()
+
+    def percentile(self, percent):
+        """성공한 호출의 지연 시간 백분위 (기록이 없으면 None)"""
+        return percentile(sorted(seconds for seconds, ok in self._samples if ok), percent)
+
+    def summary(self):
+        errors = sum(1 for _, ok in self._samples if not ok)
+        return {
+            'samples': len(self._samples),
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'error_rate': errors / len(self._samples) if self._samples else 0.0,
+        }
+
+class GroqProvider:
+    name = 'groq'
+
+    def __init__(self, api_key, model=GROQ_MODEL):
+        self.api_key = api_key
+        self.model = model
+        self._client = None  # 동기 클라이언트는 첫 동기 호출 때 생성 (asyncio 파이프라인은 쓰지 않음)
+        # 비동기 클라이언트는 이벤트 루프에 묶이므로 루프마다 1개 (파이프라인 실행 = asyncio.run 1회).
+        # 루프가 끝나기 전에 aclose() 로 닫아야 함 (GC 가 나중에 닫으면 다른 루프에서 'Event loop is closed')
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._client_lock = threading.Lock()
+
+    @property
+    def available(self):
+        return bool(self.api_key)
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = Groq(api_key=self.api_key, max_retries=CLIENT_MAX_RETRIES)
+        return self._client
+
+    def async_client(self):
+        """현재 이벤트 루프의 비동기 클라이언트 (첫 요청 때 생성, 같은 루프의 요청끼리 커넥션 재사용)"""
+        loop = asyncio.get_running_loop()
+        with self._client_lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                # aclose() 없이 끝난 루프의 클라이언트는 다시 쓰이지 않으므로 참조만 버림
+                for closed_loop in [l for l in self._async_clients if l.is_closed()]:
+                    del self._async_clients[closed_loop]
+                client = AsyncGroq(api_key=self.api_key, max_retries=CLIENT_MAX_RETRIES)
+                self._async_clients[loop] = client
+        return client
+
+    async def aclose(self):
+        """현재 이벤트 루프의 비동기 클라이언트를 닫음 (커넥션 반환, 루프 종료 전에 호출)"""
+        loop = asyncio.get_running_loop()
+        with self._client_lock:
+            client = self._async_clients.pop(loop, None)
+        if client is not None:
+            await client.close()
+
+    def _params(self, request, stream):
+        params = dict(
+            model=self.model,
+            messages=request['messages'],
+            temperature=request.get('temperature', 0.1),
+            max_tokens=request['max_tokens']
+        )
+        if stream:
+            params['stream'] = True
+        elif request.get('json_mode'):
+            params['response_format'] = {"type": "json_object"}
+        return params
+
+    def complete(self, request):
+        completion = chat_completion(self.client, request.get('expected_tokens'), **self._params(request, False))
+        return completion.choices[0].message.content
+
+    def stream(self, request):
+        stream = chat_completion(self.client, request.get('expected_tokens'), **self._params(request, True))
+        for chunk in stream:
+            record_usage(chunk_usage(chunk))
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield delta
+
+    async def complete_async(self, request):
+        completion = await chat_completion_async(
+            self.async_client(), request.get('expected_tokens'), **self._params(request, False)
+        )
+        return completion.choices[0].message.content
+
+    async def stream_async(self, request):
+        stream = await chat_completion_async(
+            self.async_client(), request.get('expected_tokens'), **self._params(request, True)
+        )
+        async with stream:  # 중간에 그만 읽어도 응답을 닫아 커넥션을 풀에 돌려줌
+            async for chunk in stream:
+                record_usage(chunk_usage(chunk))
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    yield delta
+
+class GeminiProvider:
+    name = 'gemini'
+
+    def __init__(self, api_key, model=GEMINI_MODEL):
+        self.api_key = api_key
+        self.model = model
+        if api_key and genai:
+            genai.configure(api_key=api_key)
+
+    @property
+    def available(self):
+        return bool(self.api_key and genai)
+
+    def _model(self, request):
+        # 시스템 메시지 → system_instruction, 나머지 → contents
+        system = "\n".join(m['content'] for m in request['messages'] if m['role'] == 'system')
+        return genai.GenerativeModel(self.model, system_instruction=system or None)
+
+    def _kwargs(self, request, stream):
+        contents = [
+            {'role': 'model' if m['role'] == 'assistant' else 'user', 'parts': [m['content']]}
+            for m in request['messages'] if m['role'] != 'system'
+        ]
+        config = {
+            'temperature': request.get('temperature', 0.1),
+            'max_output_tokens': request['max_tokens'],
+        }
+        if request.get('json_mode') and not stream:
+            config['response_mime_type'] = 'application/json'
+        return dict(
+            contents=contents,
+            generation_config=config,
+            stream=stream,
+            request_options={'timeout': LLM_CALL_DEADLINE}
+        )
+
+    @staticmethod
+    def _text(response):
+        # 안전 필터 등으로 파트가 없는 응답 조각은 .text 접근 시 ValueError
+        try:
+            return response.text
+        except ValueError:
+            return ""
+
+    @staticmethod
+    def _record_usage(response):
+        # 스트림은 마지막 조각의 usage_metadata 가 전체 사용량
+        usage = getattr(response, 'usage_metadata', None)
+        if usage is not None:
+            record_llm_usage(getattr(usage, 'prompt_token_count', 0), getattr(usage, 'candidates_token_count', 0))
+
+    def complete(self, request):
+        response = self._model(request).generate_content(**self._kwargs(request, False))
+        self._record_usage(response)
+        return self._text(response)
+
+    def stream(self, request):
+        last_chunk = None
+        for chunk in self._model(request).generate_content(**self._kwargs(request, True)):
+            last_chunk = chunk
+            delta = self._text(chunk)
+            if delta:
+                yield delta
+        self._record_usage(last_chunk)
+
+    async def complete_async(self, request):
+        response = await self._model(request).generate_content_async(**self._kwargs(request, False))
+        self._record_usage(response)
+        return self._text(response)
+
+    async def aclose(self):
+        pass  # genai 는 비동기 클라이언트를 내부에서 관리
+
+    async def stream_async(self, request):
+        response = await self._model(request).generate_content_async(**self._kwargs(request, True))
+        last_chunk = None
+        async for chunk in response:
+            last_chunk = chunk
+            delta = self._text(chunk)
+            if delta:
+                yield delta
+        self._record_usage(last_chunk)
+
+class LLMRouter:
+    """
+    요청을 가장 빠른 정상 제공자로 보내고, 실패하면 다음 제공자로 넘김.
+    hedge=True 이면 완성 응답(비스트리밍) 요청이 1순위의 p95 지연을 넘길 때 2순위에도 보내 먼저 온 응답 사용.
+    스트리밍은 이미 넘겨준 조각을 되돌릴 수 없으므로 hedge 하지 않고, 첫 조각 전 실패만 다음 제공자로 넘김.
+
+    request: {'messages', 'max_tokens', 'temperature', 'json_mode', 'expected_tokens'}
+    operation: 지연 시간을 따로 집계할 작업 이름 (예: 'analysis', 'briefing')
+    """
+    def __init__(self, providers, hedge=False):
+        self.providers = [provider for provider in providers if provider.available]
+        self.hedge = hedge
+        self._stats = {}
+        self._lock = threading.Lock()
+        # 동기 hedge 호출용 (스레드는 실제로 submit 될 때 생성됨)
+        self._hedge_executor = concurrent.futures.ThreadPoolExecutor(max_workers=HEDGE_MAX_WORKERS)
+
+    @property
+    def available(self):
+        return bool(self.providers)
+
+    async def aclose(self):
+        """제공자들의 현재 이벤트 루프용 비동기 클라이언트를 닫음"""
+        for provider in self.providers:
+            await provider.aclose()
+
+    def _stats_for(self, provider, operation):
+        key = (provider.name, provider.model, operation)
+        with self._lock:
+            if key not in self._stats:
+                self._stats[key] = LatencyStats()
+            return self._stats[key]
+
+    def _record(self, provider, operation, started, ok):
+        stats = self._stats_for(provider, operation)
+        with self._lock:
+            stats.record(time.perf_counter() - started, ok)
+
+    def _is_healthy(self, summary, stats):
+        if summary['samples'] < MIN_SAMPLES or summary['error_rate'] <= MAX_ERROR_RATE:
+            return True
+        return time.monotonic() - stats.last_error_at >= UNHEALTHY_COOLDOWN
+
+    def ranked(self, operation):
+        """정상 제공자를 p50 빠른 순 (기록이 부족하면 설정 순서), 비정상 제공자는 맨 뒤"""
+        entries = []
+        for order, provider in enumerate(self.providers):
+            stats = self._stats_for(provider, operation)
+            with self._lock:
+                summary = stats.summary()
+                healthy = self._is_healthy(summary, stats)
+            p50 = summary['p50'] if summary['samples'] >= MIN_SAMPLES and summary['p50'] is not None else float('inf')
+            entries.append((not healthy, p50, order, provider))
+        return [entry[-1] for entry in sorted(entries, key=lambda e: e[:3])]
+
+    def _hedge_delay(self, provider, operation):
+        stats = self._stats_for(provider, operation)
+        with self._lock:
+            if stats.summary()['samples'] < MIN_SAMPLES:
+                return None
+            return stats.percentile(HEDGE_PERCENTILE)
+
+    def _candidates(self, operation):
+        candidates = self.ranked(operation)
+        if not candidates:
+            raise RuntimeError("No LLM provider configured (GROQ_API_KEY / GEMINI_API_KEY)")
+        return candidates
+
+    def _call(self, provider, operation, request):
+        started = time.perf_counter()
+        try:
+            result = provider.complete(request)
+        except Exception:
+            self._record(provider, operation, started, ok=False)
+            raise
+        self._record(provider, operation, started, ok=True)
+        return result
+
+    async def _call_async(self, provider, operation, request):
+        started = time.perf_counter()
+        try:
+            result = await provider.complete_async(request)
+        except asyncio.CancelledError:
+            raise  # hedge 에서 진 요청은 오류로 기록하지 않음
+        except Exception:
+            self._record(provider, operation, started, ok=False)
+            raise
+        self._record(provider, operation, started, ok=True)
+        return result
+
+    def complete(self, operation, request):
+        """완성 응답 텍스트 (동기)"""
+        candidates = self._candidates(operation)
+        last_error = None
+        for position, provider in enumerate(candidates):
+            backup = candidates[position + 1] if position + 1 < len(candidates) else None
+            hedge_after = self._hedge_delay(provider, operation) if self.hedge and backup else None
+            try:
+                if hedge_after is None:
+                    return self._call(provider, operation, request)
+                return self._hedged(provider, backup, operation, request, hedge_after)
+            except Exception as e:
+                print(f"[LLM Router] {provider.name} {operation} failed: {e}")
+                last_error = e
+        raise last_error
+
+    def _hedged(self, primary, backup, operation, request, hedge_after):
+        # 현재 파이프라인 단계(contextvar)를 스레드로 넘겨 토큰이 그 단계에 집계되도록
+        first = self._hedge_executor.submit(contextvars.copy_context().run, self._call, primary, operation, request)
+        try:
+            return first.result(timeout=hedge_after)
+        except concurrent.futures.TimeoutError:
+            pass
+
+        print(f"[LLM Router] {primary.name} {operation} slower than p{HEDGE_PERCENTILE} "
+              f"({hedge_after:.1f}s), hedging to {backup.name}")
+        second = self._hedge_executor.submit(contextvars.copy_context().run, self._call, backup, operation, request)
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    # 늦은 쪽은 취소할 수 없으므로 결과만 버림 (지연 기록은 남음)
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def complete_async(self, operation, request):
+        """complete 의 asyncio 버전 (hedge 에서 진 요청은 취소)"""
+        candidates = self._candidates(operation)
+        last_error = None
+        for position, provider in enumerate(candidates):
+            backup = candidates[position + 1] if position + 1 < len(candidates) else None
+            hedge_after = self._hedge_delay(provider, operation) if self.hedge and backup else None
+            try:
+                if hedge_after is None:
+                    return await self._call_async(provider, operation, request)
+                return await self._hedged_async(provider, backup, operation, request, hedge_after)
+            except Exception as e:
+                print(f"[LLM Router] {provider.name} {operation} failed: {e}")
+                last_error = e
+        raise last_error
+
+    async def _hedged_async(self, primary, backup, operation, request, hedge_after):
+        first = asyncio.ensure_future(self._call_async(primary, operation, request))
+        done, _ = await asyncio.wait({first}, timeout=hedge_after)
+        if done:
+            return first.result()
+
+        print(f"[LLM Router] {primary.name} {operation} slower than p{HEDGE_PERCENTILE} "
+              f"({hedge_after:.1f}s), hedging to {backup.name}")
+        second = asyncio.ensure_future(self._call_async(backup, operation, request))
+        pending = {first, second}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stream(self, operation, request):
+        """응답 텍스트 조각 이터레이터 (동기)"""
+        last_error = None
+        for provider in self._candidates(operation):
+            started = time.perf_counter()
+            yielded = False
+            try:
+                for delta in provider.stream(request):
+                    yielded = True
+                    yield delta
+            except Exception as e:
+                self._record(provider, operation, started, ok=False)
+                if yielded:
+                    raise  # 이미 일부를 넘겼으면 다른 제공자로 이어 받을 수 없음
+                print(f"[LLM Router] {provider.name} {operation} stream failed: {e}")
+                last_error = e
+                continue
+            self._record(provider, operation, started, ok=True)
+            return
+        raise last_error
+
+    async def stream_async(self, operation, request):
+        """stream 의 asyncio 버전"""
+        last_error = None
+        for provider in self._candidates(operation):
+            started = time.perf_counter()
+            yielded = False
+            try:
+                async for delta in provider.stream_async(request):
+                    yielded = True
+                    yield delta
+            except Exception as e:
+                self._record(provider, operation, started, ok=False)
+                if yielded:
+                    raise
+                print(f"[LLM Router] {provider.name} {operation} stream failed: {e}")
+                last_error = e
+                continue
+            self._record(provider, operation, started, ok=True)
+            return
+        raise last_error
+
+    def get_stats(self):
+        """제공자/모델/작업별 최근 지연 시간(p50/p95)과 오류율"""
+        with self._lock:
+            return [
+                dict(provider=name, model=model, operation=operation, **stats.summary())
+                for (name, model, operation), stats in self._stats.items()
+            ]
@@ -1,10 +1,20 @@
+import os
 import streamlit as st
 import datetime
 import time
-import json
-from database import init_db, get_news_by_date, save_news, get_briefing_by_date, save_briefing, get_last_update_time
-from fetcher import fetch_naver_news
-from analyzer import analyze_news, generate_briefing
+import functools
+from database import (
+    get_dashboard_snapshot, get_job, search_index, get_mention_summary, get_pipeline_metrics,
+    SEARCH_WINDOW_DAYS
+)
+from pipeline import (
+    process_news_data, get_batch_date, is_business_hours,
+    KST, BUSINESS_HOUR_START, BUSINESS_HOUR_END
+)
+from job_lease import JobLease, make_owner_id, run_with_lease
+from bootstrap import bootstrap
+from pipeline_metrics import summarize_stages, STAGE_ORDER
+from profiling import list_reports, ENABLED_MODES as PROFILE_MODES
 
 # --- Page Config ---
 st.set_page_config(
@@ -375,32 +385,22 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- Initialization ---
-init_db()
+# 스크립트는 rerun 마다 다시 실행되지만 스키마 확인/데이터 정리는 프로세스당 1회 (bootstrap.py)
+bootstrap()
 
 # --- Constants ---
 DAILY_REFRESH_LIMIT = 20  # 하루 새로고침 횟수 제한
-BUSINESS_HOUR_START = 7  # 운영 시작 시간
-BUSINESS_HOUR_END = 22  # 운영 종료 시간
-
-# KST Timezone Definition
-KST = datetime.timezone(datetime.timedelta(hours=9))
+STATUS_REFRESH_INTERVAL = 1  # 분석 중 화면: 상태 영역(fragment)만 다시 그리는 주기(초)
+JOB_STATUS_CHECK_INTERVAL = 2  # 다른 프로세스의 작업 상태(analysis_job)를 다시 조회하는 주기(초)
+METRICS_RUN_LIMIT = 50  # 관리자 메뉴 지표에 보여줄 최근 실행 수
+METRICS_CACHE_TTL = 60  # 지표 조회/요약 결과를 세션 간에 공유하는 시간(초)
+PROFILE_REPORT_LIMIT = 5  # 관리자 메뉴에 다운로드 버튼을 보여줄 최근 프로파일 리포트 수
+# 헤드리스 스케줄러(scheduler.py)가 분석을 담당하면 앱은 조회만 함 (LLM 호출 없음)
+BACKGROUND_WORKER = os.getenv('BACKGROUND_WORKER', '').lower() in ('1', 'true', 'yes')
 
 import concurrent.futures
 
 # --- Logic ---
-def get_batch_date():
-    now = datetime.datetime.now(KST)
-    if now.hour < 7:
-        batch_date = (now - datetime.timedelta(days=1)).strftime("%Y-%m-%d")
-    else:
-        batch_date = now.strftime("%Y-%m-%d")
-    return batch_date
-
-def is_business_hours():
-    """운영 시간인지 확인 (07:00 ~ 22:00)"""
-    current_hour = datetime.datetime.now(KST).hour
-    return BUSINESS_HOUR_START <= current_hour <= BUSINESS_HOUR_END
-
 def get_refresh_count(batch_date):
     """오늘 새로고침 횟수 반환 (세션 스테이트 기반)"""
     if 'refresh_counts' not in st.session_state:
@@ -452,16 +452,19 @@ def format_time_hhmm(date_str):
     except:
         return ""
 
-def render_briefing(briefing):
-    """상단 브리핑 대시보드 렌더링"""
+def build_briefing_html(briefing):
+    """브리핑 HTML (내용이 같으면 캐시된 HTML 재사용)"""
     if not briefing:
-        return
-    
-    mood = briefing.get('mood', '')
-    mood_label = briefing.get('mood_label', '')
-    summary = briefing.get('summary', '')
-    hot_keywords = briefing.get('hot_keywords', [])
-    
+        return ""
+    return _briefing_html(
+        briefing.get('mood', ''),
+        briefing.get('mood_label', ''),
+        briefing.get('summary', ''),
+        tuple(briefing.get('hot_keywords') or ())
+    )
+
+@functools.lru_cache(maxsize=64)
+def _briefing_html(mood, mood_label, summary, hot_keywords):
     # 무드별 스타일
     if '맑음' in mood:
         mood_class = 'mood-sunny'
@@ -489,11 +492,152 @@ def render_briefing(briefing):
     </div>
 </div>
 """
-    st.markdown(briefing_html, unsafe_allow_html=True)
+    return briefing_html
+
+def render_dashboard(briefing, news_list):
+    """브리핑 + 뉴스 카드 전체를 한 번의 st.markdown 으로 렌더링 (웹소켓 메시지 1개)"""
+    html = build_briefing_html(briefing) + "".join(
+        build_news_card_html(item, idx) for idx, item in enumerate(news_list, 1)
+    )
+    st.markdown(html, unsafe_allow_html=True)
+
+def render_stock_search():
+    """종목/테마 검색 (news_stock / news_theme 역색인 조회)"""
+    st.markdown("#### 🔎 종목 · 테마 검색")
+    query = st.text_input(
+        "종목 또는 테마",
+        key="stock_search_query",
+        placeholder="예) 삼성전자, SK하이닉스, 반도체",
+        label_visibility="collapsed"
+    )
+    if not query.strip():
+        return
+    
+    matches = search_index(query)
+    if not matches:
+        st.caption(f"최근 {SEARCH_WINDOW_DAYS}일 동안 '{query.strip()}' 관련 뉴스가 없습니다.")
+        return
+    
+    kind_labels = {'stock': '종목', 'theme': '테마'}
+    selected = st.selectbox(
+        "검색 결과",
+        matches,
+        format_func=lambda m: f"{m['name']} ({kind_labels[m['kind']]}, {m['count']}건)",
+        key="stock_search_selected",
+        label_visibility="collapsed"
+    )
+    summary = get_mention_summary(selected['name'], selected['kind'])
+    
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric(f"최근 {SEARCH_WINDOW_DAYS}일 언급", f"{summary['count']}건")
+    col2.metric("호재", summary['sentiment'].get('호재', 0))
+    col3.metric("악재", summary['sentiment'].get('악재', 0))
+    col4.metric("중립", summary['sentiment'].get('중립', 0))
+    
+    st.markdown("".join(
+        build_news_card_html(item, idx) for idx, item in enumerate(summary['latest'], 1)
+    ), unsafe_allow_html=True)
+
+@st.cache_data(ttl=METRICS_CACHE_TTL, show_spinner=False)
+def load_pipeline_metrics(run_limit):
+    """최근 실행 지표 행과 단계별 요약 (조회 결과는 모든 세션이 METRICS_CACHE_TTL 동안 공유)"""
+    rows = get_pipeline_metrics(run_limit)
+    return rows, summarize_stages(rows)
 
-def render_news_card(item, index):
-    """뉴스 카드 렌더링 (번호 포함)"""
-    sentiment = item.get('sentiment', '중립')
+def render_pipeline_metrics():
+    """관리자 메뉴: 최근 파이프라인 실행의 단계별 소요 시간/토큰 (pipeline_metrics 테이블)"""
+    st.subheader("파이프라인 지표")
+    # 사이드바는 모든 세션의 rerun 마다 그려지므로 켰을 때만 조회/차트 생성
+    if not st.toggle("지표 보기", key="show_pipeline_metrics"):
+        return
+    rows, summary = load_pipeline_metrics(METRICS_RUN_LIMIT)
+    if not rows:
+        st.caption("아직 기록된 실행이 없습니다.")
+        return
+    
+    st.caption(f"최근 {summary['total']['runs']}회 실행의 단계별 소요 시간 백분위 (ms)")
+    st.bar_chart(
+        [
+            {'단계': stage, '백분위': f"p{percent}", 'ms': stats[f'p{percent}_ms']}
+            for stage, stats in summary.items()
+            for percent in (50, 95, 99)
+        ],
+        x='단계', y='ms', color='백분위', stack=False, sort=False
+    )
+    
+    # 실행 1건 = 1행 (단계별 소요 시간을 열로)
+    runs = {}
+    for row in rows:
+        run = runs.setdefault(row['run_id'], {})
+        if row['stage'] == 'total':
+            run.update({
+                '시작': datetime.datetime.fromtimestamp(row['started_at'], KST).strftime("%m-%d %H:%M"),
+                '결과': row['outcome'],
+                '기사': row['items'],
+                '토큰': row['prompt_tokens'] + row['completion_tokens'],
+                '오류': row['error'],
+            })
+        run[f"{row['stage']}(s)"] = round(row['duration_ms'] / 1000, 2)
+    columns = ['시작', '결과'] + [f"{stage}(s)" for stage in STAGE_ORDER] + ['기사', '토큰', '오류']
+    st.dataframe(
+        [{column: run.get(column) for column in columns} for run in runs.values()],
+        hide_index=True
+    )
+
+def render_profile_reports():
+    """관리자 메뉴: PIPELINE_PROFILE 로 남긴 분석 작업 프로파일 리포트 다운로드"""
+    reports = list_reports()
+    if not PROFILE_MODES and not reports:
+        return
+    
+    st.subheader("프로파일 리포트")
+    if PROFILE_MODES:
+        st.caption(f"프로파일링 켜짐: {', '.join(sorted(PROFILE_MODES))}")
+    else:
+        st.caption("프로파일링 꺼짐 (PIPELINE_PROFILE 설정 시 분석마다 리포트 생성)")
+    if not reports:
+        st.caption("아직 생성된 리포트가 없습니다.")
+        return
+    
+    # 사이드바는 모든 세션의 rerun 마다 그려지므로, 파일 내용은 리포트를 고른 경우에만 읽음
+    report = st.selectbox(
+        "리포트", reports[:PROFILE_REPORT_LIMIT], index=None, placeholder="다운로드할 리포트 선택",
+        format_func=lambda report: report['name'].removeprefix("profile-"),
+        key="profile_report"
+    )
+    if report is None:
+        return
+    with open(report['path'], 'rb') as f:
+        st.download_button(
+            "리포트 (.txt)", f.read(),
+            file_name=os.path.basename(report['path']), mime="text/plain",
+            key=f"profile_{report['name']}"
+        )
+    if report['prof_path']:
+        with open(report['prof_path'], 'rb') as f:
+            st.download_button(
+                "cProfile (.prof)", f.read(),
+                file_name=os.path.basename(report['prof_path']), mime="application/octet-stream",
+                key=f"profile_prof_{report['name']}"
+            )
+
+def build_news_card_html(item, index):
+    """뉴스 카드 HTML (번호 + 행 내용이 같으면 캐시된 HTML 재사용)"""
+    return _news_card_html(
+        index,
+        item.get('title', '제목 없음'),
+        item.get('url') or item.get('originallink') or item.get('link'),  # 미리보기 기사는 수집 원본 필드
+        item.get('pub_date'),
+        item.get('summary', '요약 없음'),
+        item.get('sentiment', '중립'),
+        item.get('theme') or '',
+        item.get('stocks') or '',
+        item.get('comment') or ''
+    )
+
+@functools.lru_cache(maxsize=512)
+def _news_card_html(index, title, link_url, pub_date, summary, sentiment, theme, stocks, comment):
+    sentiment = sentiment or '중립'
     
     # 감성별 스타일
     if "호재" in sentiment:
@@ -509,24 +653,11 @@ def render_news_card(item, index):
         insight_class = "insight-neutral"
         sentiment_label = "중립"
     
-    # keywords 파싱
-    keywords_raw = item.get('keywords') or '{}'
-    try:
-        insight_data = json.loads(keywords_raw)
-        theme = insight_data.get('theme', '')
-        stocks = insight_data.get('stocks', '')
-        comment = insight_data.get('comment', '')
-    except:
-        theme = ''
-        stocks = ''
-        comment = keywords_raw
-    
     # 번호 + 발행시간
-    formatted_time = format_time_hhmm(item.get('pub_date'))
+    formatted_time = format_time_hhmm(pub_date)
     time_str = f" | 발행시간: {formatted_time}" if formatted_time else ""
     
     # 원본 링크 HTML (텍스트 하이퍼링크)
-    link_url = item.get('url')
     link_html = ""
     if link_url and link_url.startswith('http'):
         link_html = f'<a href="{link_url}" target="_blank" style="color: #666 !important; text-decoration: underline; font-size: 0.85rem;">원본 기사 →</a>'
@@ -547,54 +678,19 @@ def render_news_card(item, index):
         <span style="color: #666; font-size: 0.85rem;">#{index}{time_str}</span>
         {link_html}
     </div>
-    <h3 style="margin: 0 0 12px 0; font-size: 1.1rem; line-height: 1.4;">{item.get('title', '제목 없음')}</h3>
+    <h3 style="margin: 0 0 12px 0; font-size: 1.1rem; line-height: 1.4;">{title}</h3>
     <div class="insight-box {insight_class}">
         <span class="{sentiment_class}">[{sentiment_label}]</span><br><br>
         {insight_html}
     </div>
-    <p style="line-height: 1.7; margin: 12px 0 0 0;">{item.get('summary', '요약 없음')}</p>
+    <p style="line-height: 1.7; margin: 12px 0 0 0;">{summary}</p>
 </div>
 '''
-    st.markdown(card_html, unsafe_allow_html=True)
+    return card_html
 
 
 # --- Background Worker Logic ---
 
-def process_news_data(batch_date):
-    """
-    백그라운드에서 실행될 실제 뉴스 처리 로직.
-    st.* 함수 사용 불가 (UI 업데이트 안됨). 로그나 리턴값으로 처리.
-    """
-    try:
-        print(f"[{batch_date}] fetching news...")
-        raw_news = fetch_naver_news(query="경제", display=20)
-        
-        if not raw_news:
-            return {"status": "error", "message": "뉴스 수집 실패"}
-
-        print(f"[{batch_date}] analyzing news...")
-        analyzed_news = analyze_news(raw_news)
-        
-        print(f"[{batch_date}] generating briefing...")
-        briefing = generate_briefing(raw_news)
-        
-        if analyzed_news:
-            from database import delete_news_by_date
-            delete_news_by_date(batch_date)
-            
-            save_news(analyzed_news, batch_date)
-            if briefing:
-                save_briefing(briefing, batch_date)
-            
-            return {"status": "success"}
-        else:
-            return {"status": "error", "message": "분석 결과 없음"}
-
-    except Exception as e:
-        print(f"Error in process_news_data: {e}")
-        return {"status": "error", "message": str(e)}
-
-
 # 캐시 문제 해결을 위해 클래스명 변경 (V3)
 class AnalysisManagerV3:
     def __init__(self):
@@ -602,19 +698,61 @@ class AnalysisManagerV3:
         self._future = None
         self._current_date = None
         self._last_error = None
+        self._partial_news = []  # 분석이 끝난 기사 (DB에 배치가 반영되기 전 미리보기용)
+        # 프로세스 간 단일 실행: DB 임대를 잡은 프로세스만 분석, 나머지는 그 작업 상태를 따라감
+        self._owner = make_owner_id()
+        self._job_cache = {}  # batch_date -> (조회 시각, job): 모든 세션의 rerun 이 공유
 
     def start_analysis(self, batch_date):
         if self.is_running(batch_date):
             return
         self._current_date = batch_date
         self._last_error = None  # Reset error on new start
-        self._future = self._executor.submit(process_news_data, batch_date)
+        self._partial_news = []
+        self._job_cache.pop(batch_date, None)
+        
+        lease = JobLease(batch_date, owner=self._owner)
+        if not lease.acquire():
+            # 다른 프로세스가 이미 분석 중 → 시작하지 않고 그 작업에 붙음
+            print(f"[{batch_date}] analysis already running in another worker, attaching")
+            self._future = None
+            return
+        
+        self._future = self._executor.submit(
+            run_with_lease, lease, process_news_data, batch_date, on_progress=self._set_partial_news
+        )
+
+    def _set_partial_news(self, news_list):
+        # 백그라운드 스레드에서 호출됨. 리스트를 통째로 교체하므로 읽는 쪽은 항상 완성된 리스트를 봄
+        self._partial_news = news_list
+
+    def get_partial_news(self, batch_date):
+        """이 프로세스에서 분석 중인 배치의 미리보기 기사 (다른 프로세스 작업이면 빈 리스트)"""
+        if self._current_date != batch_date or self._future is None:
+            return []
+        return self._partial_news
+
+    def is_local_job(self, batch_date):
+        """이 프로세스에서 실행 중인 작업인지 (다른 프로세스 작업에 붙은 경우 False)"""
+        return self._current_date == batch_date and self._future is not None and not self._future.done()
+
+    def _get_job(self, batch_date):
+        """get_job 결과를 JOB_STATUS_CHECK_INTERVAL 동안 재사용 (rerun 마다 SQLite 를 조회하지 않도록)"""
+        now = time.monotonic()
+        cached = self._job_cache.get(batch_date)
+        if cached and now - cached[0] < JOB_STATUS_CHECK_INTERVAL:
+            return cached[1]
+        job = get_job(batch_date)
+        self._job_cache[batch_date] = (now, job)
+        return job
 
     def is_running(self, batch_date):
         # 날짜가 같고, 퓨처가 있고, 아직 안 끝났으면 실행 중
-        if self._current_date == batch_date and self._future and not self._future.done():
+        if self.is_local_job(batch_date):
             return True
-        return False
+        # 다른 프로세스(또는 재시작 전)의 유효한 작업이 있으면 실행 중
+        job = self._get_job(batch_date)
+        return bool(job and job['status'] == 'running')
     
     def get_result(self):
         if self._future and self._future.done():
@@ -628,10 +766,16 @@ class AnalysisManagerV3:
                 return {"status": "error", "message": str(e)}
         return None
 
-    def check_error(self):
+    def check_error(self, batch_date=None):
         # 퓨처가 완료되었는지 확인하여 에러 업데이트 (명시적 호출)
         if self._future and self._future.done() and self._last_error is None:
              self.get_result()
+        # 다른 프로세스 작업에 붙어 있던 경우 그 작업의 에러를 표시
+        if (self._last_error is None and self._future is None
+                and batch_date and self._current_date == batch_date):
+            job = self._get_job(batch_date)
+            if job and job['status'] == 'error':
+                self._last_error = job.get('message') or "분석 실패"
         return self._last_error
 
     @property
@@ -740,13 +884,70 @@ def show_project_info():
                 st.session_state.dont_show_today = True
             st.rerun()
 
+@st.fragment(run_every=STATUS_REFRESH_INTERVAL)
+def render_analysis_status(batch_date):
+    """
+    분석 중 상태 영역. 전체 스크립트 대신 이 fragment만 주기적으로 다시 실행됨.
+    새 배치는 분석이 끝나야 DB에 한 번에 반영되므로, 그 전에는 이 프로세스의 미리보기 기사나
+    기존 배치(스냅샷 캐시)를 보여주고, 완료되면 전체를 1회 rerun.
+    """
+    manager = get_analysis_manager_v3()
+    if not manager.is_running(batch_date):
+        st.rerun()
+    
+    # 이 프로세스에서 분석 중이면 분석이 끝난 기사부터 바로 보여줌
+    partial_news = manager.get_partial_news(batch_date)
+    previous_news = get_dashboard_snapshot(batch_date)['news'] if not partial_news else []
+    if partial_news:
+        st.info("AI가 뉴스를 분석하고 있습니다... 분석이 끝난 뉴스부터 보여드립니다.")
+        render_dashboard(None, partial_news)
+    elif previous_news:
+        # 다른 프로세스가 새로고침 중 → 교체될 때까지 기존 배치를 그대로 보여줌
+        st.info("AI가 새 뉴스를 분석하고 있습니다... 완료되면 자동으로 바뀝니다.")
+        render_dashboard(None, previous_news)
+    else:
+        st.info("AI가 뉴스를 분석하고 있습니다... 잠시만 기다려주세요.")
+        
+        # Custom CSS Spinner
+        st.markdown("""
+        <style>
+        .loader {
+          border: 12px solid #f3f3f3;
+          border-radius: 50%;
+          border-top: 12px solid #3498db;
+          width: 80px;
+          height: 80px;
+          -webkit-animation: spin 1.5s linear infinite; /* Safari */
+          animation: spin 1.5s linear infinite;
+        }
+
+        /* Safari */
+        @-webkit-keyframes spin {
+          0% { -webkit-transform: rotate(0deg); }
+          100% { -webkit-transform: rotate(360deg); }
+        }
+
+        @keyframes spin {
+          0% { transform: rotate(0deg); }
+          100% { transform: rotate(360deg); }
+        }
+        </style>
+        
+        <div style="display: flex; flex-direction: column; align-items: center; justify-content: center; min-height: 300px; text-align: center;">
+            <div class="loader"></div>
+            <h3 style="margin: 24px 0 16px 0;">시장 데이터를 분석 중입니다</h3>
+            <p style="color: #666;">첫 번째 뉴스가 곧 표시됩니다... 잠시만 기다려주세요</p>
+        </div>
+        """, unsafe_allow_html=True)
+
 def main():
     batch_date = get_batch_date()
     # Cache Invalidation을 위해 함수명 변경됨 (V3)
     manager = get_analysis_manager_v3()
     
-    # DB 조회
-    news_data = get_news_by_date(batch_date)
+    # DB 조회 (데이터 버전이 같으면 모든 세션이 같은 메모리 스냅샷을 공유)
+    snapshot = get_dashboard_snapshot(batch_date)
+    news_data = snapshot['news']
     
     # --- Auto-Show & Auto-Run Logic ---
     if 'has_seen_intro' not in st.session_state:
@@ -763,7 +964,7 @@ def main():
             
             # 2. Lazy Auto-Run (Threaded)
             # 운영시간이고, 데이터가 없고, 아직 실행 중이 아니라면 -> 백그라운드 분석 시작
-            if is_business_hours() and not news_data and not manager.is_running(batch_date):
+            if not BACKGROUND_WORKER and is_business_hours() and not news_data and not manager.is_running(batch_date):
                  # 토스트 제거
                  manager.start_analysis(batch_date)
 
@@ -786,49 +987,12 @@ def main():
     
     # 1. 분석 중인 경우 (Loading State)
     if manager.is_running(batch_date):
-        st.info("AI가 뉴스를 분석하고 있습니다... 잠시만 기다려주세요.")
-        
-        # Custom CSS Spinner
-        st.markdown("""
-        <style>
-        .loader {
-          border: 12px solid #f3f3f3;
-          border-radius: 50%;
-          border-top: 12px solid #3498db;
-          width: 80px;
-          height: 80px;
-          -webkit-animation: spin 1.5s linear infinite; /* Safari */
-          animation: spin 1.5s linear infinite;
-        }
-
-        /* Safari */
-        @-webkit-keyframes spin {
-          0% { -webkit-transform: rotate(0deg); }
-          100% { -webkit-transform: rotate(360deg); }
-        }
-
-        @keyframes spin {
-          0% { transform: rotate(0deg); }
-          100% { transform: rotate(360deg); }
-        }
-        </style>
-        
-        <div style="display: flex; flex-direction: column; align-items: center; justify-content: center; min-height: 300px; text-align: center;">
-            <div class="loader"></div>
-            <h3 style="margin: 24px 0 16px 0;">시장 데이터를 분석 중입니다</h3>
-            <p style="color: #666;">약 30초 정도 소요됩니다... 잠시만 기다려주세요</p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Poll for completion
-        # 팝업 여부와 관계없이 지속적으로 체크하여, 완료되면 리로드
-        time.sleep(1)
-        st.rerun()
+        render_analysis_status(batch_date)
         return
 
     # 2. 에러가 발생한 경우 (Error State)
     # 명시적으로 에러 체크
-    error_msg = manager.check_error()
+    error_msg = manager.check_error(batch_date)
     if error_msg:
         st.error(f"분석 중 오류가 발생했습니다: {error_msg}")
         if st.button("다시 시도"):
@@ -842,14 +1006,11 @@ def main():
     # 이미 news_data는 위에서 로드했으므로, 만약 비어있는데 manager는 끝났다면?
     # -> 다시 DB 조회해봐야 함.
     if not news_data:
-        # 혹시 방금 끝났나?
-        news_data = get_news_by_date(batch_date)
-        briefing_data = get_briefing_by_date(batch_date)
-        last_update = get_last_update_time(batch_date)
-    else:
-        # 이미 데이터 있음
-        briefing_data = get_briefing_by_date(batch_date)
-        last_update = get_last_update_time(batch_date)
+        # 혹시 방금 끝났나? (쓰기가 있었으면 버전이 바뀌어 다시 조회됨)
+        snapshot = get_dashboard_snapshot(batch_date)
+        news_data = snapshot['news']
+    briefing_data = snapshot['briefing']
+    last_update = snapshot['last_update']
     
     
     # 3. 데이터가 있는 경우 (Dashboard)
@@ -863,8 +1024,8 @@ def main():
         with col1:
             st.markdown(f'<div class="update-info">마지막 업데이트: {update_time_str}</div>', unsafe_allow_html=True)
         with col2:
-            refresh_possible = can_refresh(batch_date)
-            # 수동 새로고침 버튼
+            refresh_possible = can_refresh(batch_date) and not BACKGROUND_WORKER
+            # 수동 새로고침 버튼 (스케줄러 모드에서는 자동 갱신되므로 비활성화)
             if st.button("새로고침", use_container_width=True, disabled=not refresh_possible):
                 if refresh_possible:
                     remaining_after = increment_refresh_count(batch_date)
@@ -874,19 +1035,17 @@ def main():
                     manager.start_analysis(batch_date)
                     st.rerun()
         
-        # 상단 브리핑 대시보드
-        render_briefing(briefing_data)
-        
-        # 뉴스 카드 (번호 포함)
-        for idx, item in enumerate(news_data, 1):
-            render_news_card(item, idx)
+        # 상단 브리핑 대시보드 + 뉴스 카드 (번호 포함)
+        render_dashboard(briefing_data, news_data)
             
     else:
         # 4. 데이터가 없는 경우 (Empty State)
         st.info(f"{batch_date} 기준 데이터가 아직 없습니다.")
         st.write("")
         
-        if is_business_hours():
+        if BACKGROUND_WORKER:
+            st.caption(f"뉴스는 매일 {BUSINESS_HOUR_START:02d}:00부터 자동으로 준비됩니다. 잠시 후 다시 방문해 주세요.")
+        elif is_business_hours():
             # 수동 시작 버튼
             if st.button("오늘 뉴스 분석 시작하기", type="primary", use_container_width=True):
                 manager.start_analysis(batch_date)
@@ -894,6 +1053,9 @@ def main():
         else:
             st.warning("현재 운영시간(07:00~22:00) 외입니다. 운영시간에 다시 방문해 주세요.")
 
+    st.divider()
+    render_stock_search()
+
     # --- Sidebar ---
     with st.sidebar:
         st.header("관리자 메뉴")
@@ -906,6 +1068,9 @@ def main():
             st.toast("데이터가 초기화되었습니다.")
             time.sleep(1)
             st.rerun()
+        st.divider()
+        render_pipeline_metrics()
+        render_profile_reports()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,156 @@
+import asyncio
+import datetime
+from database import (
+    publish_batch, get_news_by_date, get_briefing_by_date, get_fetch_watermarks, save_fetch_watermarks
+)
+from fetcher import fetch_naver_news_incremental_async, release_from_watermarks, SEARCH_QUERIES
+from dedup import drop_known_duplicates
+from analyzer import analyze_news_async, generate_briefing_async, close_router_async, MAX_NEWS_ITEMS
+from pipeline_metrics import PipelineRun
+from profiling import profiled
+
+# Streamlit 앱과 헤드리스 스케줄러가 함께 쓰는 배치 처리 로직 (st.* 사용 금지)
+
+BUSINESS_HOUR_START = 7  # 운영 시작 시간
+BUSINESS_HOUR_END = 22  # 운영 종료 시간
+BATCH_BOUNDARY_HOUR = 7  # 이 시각(KST) 전에는 전날 배치로 취급
+
+# KST Timezone Definition
+KST = datetime.timezone(datetime.timedelta(hours=9))
+
+def get_batch_date(now=None):
+    now = now or datetime.datetime.now(KST)
+    if now.hour < BATCH_BOUNDARY_HOUR:
+        batch_date = (now - datetime.timedelta(days=1)).strftime("%Y-%m-%d")
+    else:
+        batch_date = now.strftime("%Y-%m-%d")
+    return batch_date
+
+def is_business_hours(now=None):
+    """운영 시간인지 확인 (07:00 ~ 22:00)"""
+    current_hour = (now or datetime.datetime.now(KST)).hour
+    return BUSINESS_HOUR_START <= current_hour <= BUSINESS_HOUR_END
+
+CANDIDATE_COUNT = 20  # 분석 후보 기사 수
+
+def merge_into_batch(new_items, existing_items, limit=MAX_NEWS_ITEMS):
+    """
+    새로 분석한 기사를 기존 배치 앞에 합침 (증분 수집의 새 기사가 더 최신이므로 우선).
+    같은 URL 은 새 분석 결과를 쓰고, 합친 뒤 limit 개까지만 남김 (가장 오래된 기사부터 밀려남)
+    기존 배치와 거의 같은 기사(재게재)는 분석 전에 drop_known_duplicates 로 걸러져 있어야 함
+    """
+    merged = {}
+    for item in new_items + existing_items:
+        url = item.get('originallink') or item.get('url') or item.get('link')
+        merged.setdefault(url, item)
+    return list(merged.values())[:limit]
+
+@profiled
+def process_news_data(batch_date, on_progress=None, run=None, full_refresh=False, lease_owner=None):
+    """
+    백그라운드에서 실행될 실제 뉴스 처리 로직.
+    st.* 함수 사용 불가 (UI 업데이트 안됨). 로그나 리턴값으로 처리.
+    on_progress: 기사 분석이 끝날 때마다 지금까지의 배치(새 기사 + 기존 기사) 리스트로 호출 (대기 중인 화면 갱신용)
+    run: 단계별 지표를 기록할 PipelineRun (없으면 새로 만듦). 지표는 pipeline_metrics 테이블에 저장
+    full_refresh: True 면 워터마크/기존 배치를 무시하고 후보를 전부 다시 수집해서 배치를 교체
+    lease_owner: job_lease.run_with_lease 가 넘기는 임대 owner. 게시 트랜잭션에서 아직 임대를 갖고 있는지 확인
+    PIPELINE_PROFILE 을 설정하면 cProfile/tracemalloc/샘플링 리포트를 남김 (profiling.py)
+
+    배치가 이미 있으면 증분 수집: 쿼리별 워터마크 이후의 새 기사만 분석해서 기존 배치에 합침.
+    새 기사가 없으면 쿼리당 HTTP 요청 1번으로 끝나고 LLM 은 호출하지 않음.
+
+    호출한 스레드(분석 매니저의 ThreadPoolExecutor, 스케줄러)에서 새 이벤트 루프로 asyncio 파이프라인을 실행.
+    """
+    return asyncio.run(process_news_data_async(batch_date, on_progress, run, full_refresh, lease_owner))
+
+async def process_news_data_async(batch_date, on_progress=None, run=None, full_refresh=False, lease_owner=None):
+    """
+    process_news_data 의 asyncio 구현.
+    브리핑은 후보 기사 제목만 쓰므로 기사 분석과 동시에 요청 (전체 시간 ≈ 가장 느린 LLM 호출)
+    """
+    run = run or PipelineRun(batch_date)
+    try:
+        result = await _process_news_data_async(batch_date, on_progress, run, full_refresh, lease_owner)
+    finally:
+        await close_router_async()  # 이 루프에서 만든 LLM 클라이언트는 루프와 함께 끝냄
+    run.finish(result.get('outcome', result['status']), result.get('message'), items=result.get('items'))
+    return result
+
+async def _process_news_data_async(batch_date, on_progress, run, full_refresh, lease_owner):
+    try:
+        # SQLite 호출은 잠금 대기(busy timeout, 풀 대기)로 길어질 수 있으므로 이벤트 루프 밖 스레드에서
+        existing = [] if full_refresh else await asyncio.to_thread(get_news_by_date, batch_date)
+        # 배치가 비어 있으면(새 날짜, 초기화 후) 워터마크와 관계없이 전체 수집
+        watermarks = await asyncio.to_thread(get_fetch_watermarks, SEARCH_QUERIES) if existing else {}
+
+        print(f"[{batch_date}] fetching news ({'incremental' if watermarks else 'full'})...")
+        with run.stage('fetch') as span:
+            raw_news, next_watermarks = await fetch_naver_news_incremental_async(watermarks, display=CANDIDATE_COUNT)
+            span.items = len(raw_news)
+        # 새 기사끼리는 수집 단계에서 중복 제거됨. 기존 배치 기사의 재게재도 분석 전에 제외
+        raw_news = drop_known_duplicates(raw_news, existing)
+
+        if not raw_news:
+            if existing:
+                await asyncio.to_thread(save_fetch_watermarks, next_watermarks)
+                print(f"[{batch_date}] no new articles, skipping analysis")
+                return {"status": "success", "outcome": "skipped", "message": "새 기사 없음"}
+            return {"status": "error", "message": "뉴스 수집 실패"}
+
+        print(f"[{batch_date}] analyzing {len(raw_news)} news + generating briefing...")
+        streamed = []
+
+        def collect_streamed_item(item):
+            # 분석이 끝난 기사부터 화면에 전달 (DB 반영은 마지막에 한 번에)
+            streamed.append(item)
+            if on_progress:
+                on_progress(merge_into_batch(streamed, existing))
+
+        unanalyzed = []
+
+        async def analyze():
+            with run.stage('analyze') as span:
+                analyzed = await analyze_news_async(
+                    raw_news, on_result=collect_streamed_item, on_missing=unanalyzed.extend
+                )
+                span.items = len(analyzed)
+                return analyzed
+
+        async def briefing():
+            # 브리핑은 기존 배치까지 포함한 제목으로 (새 기사가 앞)
+            with run.stage('briefing') as span:
+                briefing_news = raw_news + existing
+                result = await generate_briefing_async(briefing_news)
+                span.items = len(briefing_news)
+                if result is None:
+                    span.outcome = 'error'
+                return result
+
+        # 브리핑 실패는 None 으로 처리되고, 분석 실패만 예외로 전파됨
+        # (각 단계는 자기 태스크 안에서 계측되므로 동시에 실행돼도 토큰이 섞이지 않음)
+        analyzed_news, briefing_data = await asyncio.gather(analyze(), briefing())
+        if unanalyzed:
+            # 일부 청크 실패(429, 타임아웃 등)로 분석 못 한 기사는 본 것으로 기록하지 않음 (다음 실행에서 다시 수집)
+            print(f"[{batch_date}] {len(unanalyzed)} articles not analyzed, keeping them for the next run")
+            next_watermarks = release_from_watermarks(next_watermarks, unanalyzed)
+
+        if analyzed_news:
+            news = merge_into_batch(analyzed_news, existing)
+            if briefing_data is None and existing:
+                briefing_data = await asyncio.to_thread(get_briefing_by_date, batch_date)  # 새 브리핑 실패 시 기존 브리핑 유지
+            # 기존 배치를 합친 배치로 원자적으로 교체 (읽는 쪽에 빈 상태가 보이지 않음), 워터마크도 함께 커밋
+            with run.stage('publish') as span:
+                await asyncio.to_thread(publish_batch, news, briefing_data, batch_date, next_watermarks, lease_owner)
+                span.items = len(news)
+
+            return {"status": "success", "items": len(analyzed_news)}
+        elif existing:
+            # 새 기사가 모두 정보가치 낮음으로 걸러짐: 기존 배치 유지
+            await asyncio.to_thread(save_fetch_watermarks, next_watermarks)
+            return {"status": "success", "outcome": "skipped", "message": "새로 선정된 기사 없음"}
+        else:
+            return {"status": "error", "message": "분석 결과 없음"}
+
+    except Exception as e:
+        print(f"Error in process_news_data: {e}")
+        return {"status": "error", "message": str(e)}
@@ -0,0 +1,128 @@
+import time
+import uuid
+import threading
+import contextvars
+from contextlib import contextmanager
+from database import save_pipeline_metrics
+
+# 파이프라인 실행 1회를 단계(span)별로 계측: 소요 시간, 처리 기사 수, LLM 토큰(usage), 결과
+# 단계 안에서 호출된 LLM 의 토큰은 contextvar 로 현재 단계에 더해짐 (asyncio.gather 로 동시에 도는 단계도 각각 집계)
+STAGE_ORDER = ['fetch', 'analyze', 'briefing', 'publish', 'total']
+
+_current_span = contextvars.ContextVar('pipeline_span', default=None)
+
+def percentile(sorted_values, percent):
+    """정렬된 값의 백분위 (최근접 순위, 값이 없으면 None). 지연 시간 라우팅과 벤치마크도 같은 정의를 사용"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(percent / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+class StageSpan:
+    def __init__(self, name):
+        self.name = name
+        self.started_at = time.time()
+        self.duration_ms = 0.0
+        self.items = None
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.outcome = 'success'
+        self.error = None
+        self._lock = threading.Lock()
+
+    def add_tokens(self, prompt_tokens, completion_tokens):
+        with self._lock:
+            self.prompt_tokens += prompt_tokens or 0
+            self.completion_tokens += completion_tokens or 0
+
+def record_llm_usage(prompt_tokens, completion_tokens):
+    """LLM 응답의 usage 를 현재 단계에 기록 (계측 중인 단계가 없으면 무시)"""
+    span = _current_span.get()
+    if span is not None:
+        span.add_tokens(prompt_tokens, completion_tokens)
+
+class PipelineRun:
+    """
+    with run.stage('fetch') as span: ... span.items = len(raw_news)
+    예외가 나면 그 단계는 outcome='error' 로 기록되고 예외는 그대로 전파됨.
+    finish() 에서 stage='total' 행과 함께 pipeline_metrics 테이블에 저장.
+    """
+    def __init__(self, batch_date):
+        self.batch_date = batch_date
+        self.run_id = uuid.uuid4().hex
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.spans = []
+
+    @contextmanager
+    def stage(self, name):
+        span = StageSpan(name)
+        self.spans.append(span)
+        token = _current_span.set(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.outcome = 'error'
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration_ms = (time.perf_counter() - started) * 1000
+            _current_span.reset(token)
+
+    def finish(self, outcome, error=None, items=None):
+        """실행 종료 기록. 지표 저장 실패는 파이프라인 결과에 영향을 주지 않음"""
+        total = StageSpan('total')
+        total.started_at = self.started_at
+        total.duration_ms = (time.perf_counter() - self._started) * 1000
+        total.items = items
+        total.prompt_tokens = sum(span.prompt_tokens for span in self.spans)
+        total.completion_tokens = sum(span.completion_tokens for span in self.spans)
+        total.outcome = outcome
+        total.error = error
+        spans = self.spans + [total]
+
+        print(f"[Metrics] {self.batch_date} {outcome}: " + ", ".join(
+            f"{span.name} {span.duration_ms / 1000:.2f}s" for span in spans
+        ))
+        try:
+            save_pipeline_metrics([
+                {
+                    'run_id': self.run_id,
+                    'batch_date': self.batch_date,
+                    'stage': span.name,
+                    'started_at': span.started_at,
+                    'duration_ms': round(span.duration_ms, 2),
+                    'items': span.items,
+                    'prompt_tokens': span.prompt_tokens,
+                    'completion_tokens': span.completion_tokens,
+                    'outcome': span.outcome,
+                    'error': span.error,
+                }
+                for span in spans
+            ])
+        except Exception as e:
+            print(f"[Metrics] failed to save pipeline metrics: {e}")
+
+def summarize_stages(rows):
+    """
+    get_pipeline_metrics() 행을 단계별로 요약
+    Returns: {stage: {'runs', 'errors', 'p50_ms', 'p95_ms', 'p99_ms', 'avg_tokens'}} (STAGE_ORDER 순)
+    """
+    by_stage = {}
+    for row in rows:
+        by_stage.setdefault(row['stage'], []).append(row)
+
+    summary = {}
+    for stage in sorted(by_stage, key=lambda s: STAGE_ORDER.index(s) if s in STAGE_ORDER else len(STAGE_ORDER)):
+        stage_rows = by_stage[stage]
+        durations = sorted(row['duration_ms'] for row in stage_rows)
+        summary[stage] = {
+            'runs': len(stage_rows),
+            'errors': sum(1 for row in stage_rows if row['outcome'] == 'error'),
+            'p50_ms': percentile(durations, 50),
+            'p95_ms': percentile(durations, 95),
+            'p99_ms': percentile(durations, 99),
+            'avg_tokens': round(sum(row['prompt_tokens'] + row['completion_tokens'] for row in stage_rows) / len(stage_rows)),
+        }
+    return summary
@@ -0,0 +1,213 @@
+import os
+import io
+import sys
+import time
+import pstats
+import cProfile
+import datetime
+import threading
+import functools
+import tracemalloc
+import collections
+
+# 백그라운드 분석 작업 프로파일링 (환경 변수로 켤 때만 동작)
+#   PIPELINE_PROFILE=cpu,memory,sample   (1 / all = 전부)
+#     cpu    - cProfile: 함수별 CPU 시간 (.prof 파일도 함께 저장, snakeviz 등으로 열람)
+#     memory - tracemalloc: 할당 위치별 메모리, 최대 사용량
+#     sample - 작업 스레드 스택을 주기적으로 샘플링: 네트워크 대기까지 포함한 벽시계 시간
+#   PIPELINE_PROFILE_DIR=profiles        리포트 저장 디렉터리
+# 꺼져 있으면 profiled() 가 원래 함수를 그대로 반환하므로 비용 없음
+PROFILE_MODES = ('cpu', 'memory', 'sample')
+PROFILE_DIR = os.getenv('PIPELINE_PROFILE_DIR', 'profiles')
+PROFILE_TOP_N = 30  # 리포트에 남길 상위 함수/할당 위치 수
+PROFILE_KEEP = 20  # 보관할 최근 리포트 수 (오래된 것부터 삭제)
+SAMPLE_INTERVAL = 0.01  # 스택 샘플링 주기(초)
+TRACEMALLOC_FRAMES = 10  # 할당 위치별 저장할 스택 깊이
+
+def _enabled_modes(value):
+    modes = {mode.strip().lower() for mode in (value or '').split(',') if mode.strip()}
+    if modes & {'1', 'true', 'yes', 'all'}:
+        return set(PROFILE_MODES)
+    return modes & set(PROFILE_MODES)
+
+ENABLED_MODES = _enabled_modes(os.getenv('PIPELINE_PROFILE'))
+
+# cProfile 은 동시에 하나만 켤 수 있으므로 (Python 3.12+) 겹친 실행은 cpu 프로파일을 건너뜀
+_cpu_lock = threading.Lock()
+
+class StackSampler:
+    """대상 스레드의 스택을 interval 마다 읽어 함수별 샘플 수 집계 (벽시계 기준, 대기 중인 시간 포함)"""
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = 0
+        self.self_counts = collections.Counter()  # 스택 맨 위 함수 (실제로 그 자리에 머문 시간)
+        self.total_counts = collections.Counter()  # 스택 어딘가에 있는 함수 (하위 호출 포함 시간)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            self.self_counts[_frame_label(frame)] += 1
+            seen = set()
+            while frame is not None:
+                label = _frame_label(frame)
+                if label not in seen:  # 재귀 호출은 한 번만
+                    seen.add(label)
+                    self.total_counts[label] += 1
+                frame = frame.f_back
+
+    def report(self, top_n):
+        lines = [f"samples: {self.samples} (every {self.interval * 1000:.0f}ms)", ""]
+        for title, counts in (("self", self.self_counts), ("inclusive", self.total_counts)):
+            lines.append(f"{'samples':>8} {'%':>6}  {title}")
+            for label, count in counts.most_common(top_n):
+                lines.append(f"{count:>8} {count / max(1, self.samples) * 100:>5.1f}%  {label}")
+            lines.append("")
+        return "\n".join(lines)
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _cpu_report(profile, top_n):
+    stream = io.StringIO()
+    stats = pstats.Stats(profile, stream=stream)
+    stats.sort_stats('cumulative').print_stats(top_n)
+    stats.sort_stats('tottime').print_stats(top_n)
+    return stream.getvalue()
+
+def _memory_report(snapshot, peak, top_n):
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    ))
+    lines = [f"peak traced memory: {peak / 1024 / 1024:.2f} MiB", ""]
+    for stat in snapshot.statistics('lineno')[:top_n]:
+        frame = stat.traceback[0]
+        lines.append(f"{stat.size / 1024:>10.1f} KiB {stat.count:>8} blocks  {frame.filename}:{frame.lineno}")
+    return "\n".join(lines)
+
+def _report_name(fn, args):
+    timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    label = args[0] if args and isinstance(args[0], str) else ""
+    return "-".join(part for part in ("profile", timestamp, fn.__name__, label) if part)
+
+def _prune_reports():
+    reports = list_reports()
+    stale_names = {report['name'] for report in reports[PROFILE_KEEP:]}
+    for filename in os.listdir(PROFILE_DIR):
+        if os.path.splitext(filename)[0] in stale_names:
+            os.remove(os.path.join(PROFILE_DIR, filename))
+
+def _write_report(name, fn, elapsed, result, sections, profile):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    header = [
+        f"function: {fn.__module__}.{fn.__name__}",
+        f"started: {name}",
+        f"wall time: {elapsed:.3f}s",
+        f"modes: {', '.join(sorted(ENABLED_MODES))}",
+        f"result: {result}",
+    ]
+    body = "\n\n".join(f"=== {title} ===\n{text}" for title, text in sections)
+    with open(os.path.join(PROFILE_DIR, f"{name}.txt"), 'w', encoding='utf-8') as f:
+        f.write("\n".join(header) + "\n\n" + body + "\n")
+    if profile is not None:
+        profile.dump_stats(os.path.join(PROFILE_DIR, f"{name}.prof"))
+    _prune_reports()
+    print(f"[Profile] report written: {os.path.join(PROFILE_DIR, name)}.txt")
+
+def profiled(fn):
+    """
+    PIPELINE_PROFILE 로 켠 프로파일러 안에서 fn 을 실행하고 PROFILE_DIR 에 리포트 저장.
+    프로파일링이 꺼져 있으면 fn 을 그대로 반환 (래퍼 호출 비용도 없음).
+    """
+    if not ENABLED_MODES:
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        name = _report_name(fn, args)
+        profile = None
+        sampler = None
+        started_tracemalloc = False
+
+        if 'cpu' in ENABLED_MODES and _cpu_lock.acquire(blocking=False):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # 다른 프로파일러(디버거 등)가 이미 켜져 있음
+                _cpu_lock.release()
+                profile = None
+        if 'memory' in ENABLED_MODES and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            started_tracemalloc = True
+        if 'sample' in ENABLED_MODES:
+            sampler = StackSampler(threading.get_ident())
+            sampler.start()
+
+        started = time.perf_counter()
+        result = None
+        try:
+            result = fn(*args, **kwargs)
+            return result
+        finally:
+            elapsed = time.perf_counter() - started
+            # 리포트 작성 자체가 측정되지 않도록 먼저 모두 멈춤
+            if profile is not None:
+                profile.disable()
+                _cpu_lock.release()
+            if sampler is not None:
+                sampler.stop()
+            if started_tracemalloc:
+                _, peak = tracemalloc.get_traced_memory()
+                snapshot = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+
+            sections = []
+            if profile is not None:
+                sections.append(("cpu (cProfile)", _cpu_report(profile, PROFILE_TOP_N)))
+            if sampler is not None:
+                sections.append(("wall clock (sampling)", sampler.report(PROFILE_TOP_N)))
+            if started_tracemalloc:
+                sections.append(("memory (tracemalloc)", _memory_report(snapshot, peak, PROFILE_TOP_N)))
+            try:
+                _write_report(name, fn, elapsed, result, sections, profile)
+            except Exception as e:
+                # 리포트 저장 실패로 분석 결과가 바뀌지 않도록
+                print(f"[Profile] failed to write report: {e}")
+
+    return wrapper
+
+def list_reports():
+    """저장된 리포트 (최신순): [{'name', 'path', 'prof_path'(없으면 None), 'modified'}]"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    reports = []
+    for filename in os.listdir(PROFILE_DIR):
+        name, ext = os.path.splitext(filename)
+        if ext != '.txt' or not name.startswith('profile-'):
+            continue
+        path = os.path.join(PROFILE_DIR, filename)
+        prof_path = os.path.join(PROFILE_DIR, f"{name}.prof")
+        reports.append({
+            'name': name,
+            'path': path,
+            'prof_path': prof_path if os.path.exists(prof_path) else None,
+            'modified': os.path.getmtime(path),
+        })
+    return sorted(reports, key=lambda report: report['modified'], reverse=True)
@@ -0,0 +1,114 @@
+import re
+
+# 토큰 수 추정 (별도 토크나이저 없이 근사)
+# Llama 3 토크나이저 기준 한글/한자는 대략 글자당 1토큰, 그 외(영문/숫자/공백)는 약 4글자당 1토큰
+CJK_TOKENS_PER_CHAR = 1.0
+OTHER_CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 8  # 메시지(role 등) 포맷 오버헤드
+
+_CJK_RE = re.compile(r'[ᄀ-ᇿ㄰-㆏가-힣一-鿿]')
+
+def estimate_tokens(text):
+    """텍스트의 대략적인 토큰 수"""
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    other = len(text) - cjk
+    return int(cjk * CJK_TOKENS_PER_CHAR + other / OTHER_CHARS_PER_TOKEN + 0.999)
+
+def estimate_messages_tokens(messages):
+    return sum(estimate_tokens(m.get('content', '')) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+def truncate_to_tokens(text, max_tokens):
+    """
+    max_tokens 이내가 되도록 뒤를 잘라냄 (잘린 경우 끝에 '…')
+    Returns: (text, 잘렸는지 여부)
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text, False
+    if max_tokens <= 0:
+        return "", True
+
+    # 토큰 추정이 글자 수에 대해 단조 증가하므로 이분 탐색
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(text[:mid]) + 1 <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low].rstrip() + "…", True
+
+def pack_articles(news_list, fields, fixed_tokens=0, input_budget=None, output_budget=None,
+                  per_article_tokens=None, output_tokens_per_article=0, trim_field=None):
+    """
+    기사들을 토큰 예산 안에서 "[번호] 라벨: 값" 형식의 프롬프트 본문으로 묶음.
+
+    fields: [(라벨, 키)] 예) [("제목", "title"), ("내용", "description")]
+    fixed_tokens: 시스템/지시문 등 기사 외 프롬프트 토큰 수
+    input_budget: 입력 전체 토큰 한도 (None 이면 제한 없음)
+    output_budget: 출력 토큰 한도. 기사당 output_tokens_per_article 씩 필요하다고 보고 기사 수 제한
+    per_article_tokens: 기사 1건 최대 토큰. 넘으면 trim_field 값을 잘라냄
+    Returns: dict
+        content: 프롬프트 본문 (번호는 1부터, 포함된 기사 순서)
+        indices: 포함된 기사의 news_list 인덱스 (프롬프트 번호 n → indices[n-1])
+        truncated: 내용이 잘린 기사 인덱스
+        dropped: 예산 초과로 빠진 기사 인덱스
+        input_tokens / output_tokens: 예상 입력 토큰 / 예상 출력 토큰
+    """
+    max_articles = len(news_list)
+    if output_budget is not None and output_tokens_per_article:
+        max_articles = min(max_articles, output_budget // output_tokens_per_article)
+
+    parts = []
+    indices = []
+    truncated = []
+    dropped = []
+    used_tokens = fixed_tokens
+
+    for idx, item in enumerate(news_list):
+        if len(indices) >= max_articles:
+            dropped.append(idx)
+            continue
+
+        number = len(indices) + 1
+        values = {key: str(item.get(key) or '') for _, key in fields}
+        text = _format_article(number, fields, values)
+        tokens = estimate_tokens(text)
+
+        if per_article_tokens is not None and tokens > per_article_tokens and trim_field:
+            # 잘라낼 필드를 뺀 나머지 토큰만큼 제외하고 남은 예산을 잘라낼 필드에 배정
+            rest = tokens - estimate_tokens(values[trim_field])
+            values[trim_field], was_truncated = truncate_to_tokens(values[trim_field], per_article_tokens - rest)
+            if was_truncated:
+                truncated.append(idx)
+            text = _format_article(number, fields, values)
+            tokens = estimate_tokens(text)
+
+        if input_budget is not None and used_tokens + tokens > input_budget:
+            dropped.append(idx)
+            continue
+
+        parts.append(text)
+        indices.append(idx)
+        used_tokens += tokens
+
+    return {
+        'content': "".join(parts),
+        'indices': indices,
+        'truncated': truncated,
+        'dropped': dropped,
+        'input_tokens': used_tokens,
+        'output_tokens': len(indices) * output_tokens_per_article,
+    }
+
+def _format_article(number, fields, values):
+    lines = [f"{label}: {values[key]}" for label, key in fields]
+    return f"[{number}] " + "\n".join(lines) + "\n\n"
+
+def report_packing(name, packed, total):
+    """패킹 결과 로그 (잘리거나 빠진 기사가 있을 때만)"""
+    if packed['truncated'] or packed['dropped']:
+        print(f"[{name}] prompt packed {len(packed['indices'])}/{total} articles "
+              f"(~{packed['input_tokens']} input tokens), "
+              f"truncated={len(packed['truncated'])}, dropped={len(packed['dropped'])}")
@@ -0,0 +1,105 @@
+"""
+헤드리스 스케줄러 (Streamlit 없이 실행)
+
+- 매일 07:00(KST) 배치 경계에 그날 배치를 미리 분석 (첫 방문자가 기다리지 않도록)
+- 운영시간 동안 REFRESH_INTERVAL_MINUTES 마다 증분 새로고침 (쿼리별 워터마크 이후의 새 기사만).
+  새 기사가 없으면 쿼리당 요청 1번으로 끝나고 LLM 호출 없이 건너뜀
+- 같은 DB의 작업 임대(job lease)를 사용하므로 Streamlit 앱/다른 스케줄러와 중복 실행되지 않음
+
+앱을 조회 전용으로 쓰려면 Streamlit 프로세스에 BACKGROUND_WORKER=1 을 설정하세요.
+
+사용법:
+    python scheduler.py              # 데몬으로 계속 실행
+    python scheduler.py --once       # 지금 1회만 실행
+    python scheduler.py --interval 15
+"""
+import sys
+import time
+import argparse
+import datetime
+
+from job_lease import JobLease, run_with_lease
+from bootstrap import bootstrap
+from pipeline import (
+    process_news_data, get_batch_date, is_business_hours, KST, BATCH_BOUNDARY_HOUR
+)
+
+REFRESH_INTERVAL_MINUTES = 30  # 운영시간 중 새로고침 주기
+
+def refresh_batch(batch_date, force=False, lease_owner=None):
+    """
+    배치가 있으면 워터마크 이후의 새 기사만 수집/분석해서 합치고, 새 기사가 없으면 LLM 호출 없이 종료.
+    force: 워터마크를 무시하고 전체 후보를 다시 수집/분석해서 배치 교체
+    lease_owner: 작업 임대 owner (임대를 잃었으면 배치를 게시하지 않음)
+    """
+    return process_news_data(batch_date, full_refresh=force, lease_owner=lease_owner)
+
+def run_cycle(force=False):
+    batch_date = get_batch_date()
+    lease = JobLease(batch_date)
+    if not lease.acquire():
+        print(f"[{batch_date}] another worker is processing this batch, skipping")
+        return None
+
+    started = time.perf_counter()
+    result = run_with_lease(lease, refresh_batch, batch_date, force)
+    print(f"[{batch_date}] {result.get('status')} in {time.perf_counter() - started:.1f}s"
+          + (f" ({result['message']})" if result.get('message') else ""))
+    return result
+
+def next_run_time(now, interval_minutes):
+    """
+    다음 실행 시각: 운영시간 중에는 interval 뒤, 아니면 다음 07:00 배치 경계 (경계는 항상 지킴).
+    interval 뒤가 운영시간을 벗어나면(예: 22:50 + 30분) 그날은 끝내고 다음 경계로
+    """
+    boundary = now.replace(hour=BATCH_BOUNDARY_HOUR, minute=0, second=0, microsecond=0)
+    if boundary <= now:
+        boundary += datetime.timedelta(days=1)
+
+    if is_business_hours(now):
+        next_run = now + datetime.timedelta(minutes=interval_minutes)
+        if next_run < boundary and is_business_hours(next_run):
+            return next_run
+    return boundary
+
+def _run_cycle_safely():
+    try:
+        run_cycle()
+    except Exception as e:
+        # 일시적인 오류로 데몬이 죽지 않도록 기록만 하고 다음 주기에 재시도
+        print(f"Scheduler cycle error: {e}")
+
+def run_forever(interval_minutes):
+    print(f"Scheduler started (refresh every {interval_minutes} min during business hours)")
+    if is_business_hours():
+        _run_cycle_safely()  # 시작 직후 실행도 실패하면 다음 주기로 넘어감
+
+    while True:
+        now = datetime.datetime.now(KST)
+        wake_at = next_run_time(now, interval_minutes)
+        print(f"Next run at {wake_at:%Y-%m-%d %H:%M} KST")
+        time.sleep(max(0, (wake_at - now).total_seconds()))
+        # sleep 이 늦게 깨어나 운영시간을 넘긴 경우에도 LLM 새로고침을 돌리지 않음
+        if is_business_hours():
+            _run_cycle_safely()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="매일 경제 브리핑 배치 스케줄러")
+    parser.add_argument("--once", action="store_true", help="1회 실행 후 종료")
+    parser.add_argument("--force", action="store_true", help="워터마크를 무시하고 전체 다시 수집/분석 (--once 와 함께)")
+    parser.add_argument("--interval", type=int, default=REFRESH_INTERVAL_MINUTES, help="운영시간 중 새로고침 주기(분)")
+    args = parser.parse_args(argv)
+
+    bootstrap()
+    if args.once:
+        result = run_cycle(force=args.force)
+        return 0 if result is None or result.get("status") == "success" else 1
+
+    try:
+        run_forever(args.interval)
+    except KeyboardInterrupt:
+        print("Scheduler stopped")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())